@@ -0,0 +1 @@
+Added `chunk_size` parameter to `DataSet.iter_rows` to download rows window by window
@@ -0,0 +1 @@
+Texts of `getTextAlways` columns are requested ahead of `DataSet.iter_rows` iteration by the pool of threads
@@ -0,0 +1 @@
+Added `DataSet.to_columns` and `DataSet.to_numpy` methods to export dataset as typed column buffers
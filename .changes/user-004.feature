@@ -0,0 +1 @@
+Added `row_type` parameter to `DataSet.iter_rows` to iterate over tuples or namedtuples instead of dicts
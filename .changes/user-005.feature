@@ -0,0 +1 @@
+Added `DatasetCache` to store downloaded datasets on the disk until the node is re-executed
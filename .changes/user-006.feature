@@ -0,0 +1 @@
+Added `parallel` parameter to `DataSet.iter_rows` to download several windows concurrently
@@ -0,0 +1 @@
+Added `DataSet.to_csv` and `DataSet.to_jsonl` methods to stream dataset to file
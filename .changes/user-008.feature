@@ -0,0 +1 @@
+Dataset wrapper guids are cached by the project and resolved before the first `/dataset/*` request
@@ -0,0 +1 @@
+Project nodes are looked up by name and type index. Passing the name shared by several nodes raises `ClientException` instead of choosing the first node
@@ -0,0 +1 @@
+Added `node_list_ttl` and `lazy` parameters to `API.project`, `Project.get_node` and `Project.invalidate_node_list` methods to control the cached node list
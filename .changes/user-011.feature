@@ -0,0 +1 @@
+Added `Waiter` polling strategy with exponential backoff and timeout, and `Project.wait` method returning the execution time
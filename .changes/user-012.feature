@@ -0,0 +1 @@
+Added `API.watcher` and `Project.watch` to await execution waves of many projects by the single background thread
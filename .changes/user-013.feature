@@ -0,0 +1 @@
+Added `API.run_projects` to execute, save and unload many projects concurrently
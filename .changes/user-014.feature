@@ -0,0 +1 @@
+Added `ExecutionProfiler` to record nodes execution statistics and find regressions against the baseline run
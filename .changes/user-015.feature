@@ -0,0 +1 @@
+Added `sweep` and `grid` functions to run parameter sweeps over several project copies
@@ -0,0 +1 @@
+The list of `Parameters` node types is cached per server build, added `Parameters.schema` and `validate` parameter of `Parameters.set`
@@ -0,0 +1 @@
+Added connection pool and timeout parameters to `API` and made it safe to share between threads
@@ -0,0 +1 @@
+Added `polyanalyst6api.aio` module with asyncio counterparts of `API`, `Project`, `DataSet` and `Drive` based on aiohttp
@@ -0,0 +1 @@
+Binary responses are no longer decoded as json, added `Drive.download` streaming the file to disk and optional orjson decoding of json responses
@@ -0,0 +1 @@
+Added `hooks` parameter to `API` called after every request and `RequestMetrics` collecting per-endpoint metrics with Prometheus and json exporters
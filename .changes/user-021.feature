@@ -0,0 +1 @@
+Added `coalesce` and `coalesce_ttl` parameters to `API` to share one round trip between concurrent identical GET requests
@@ -0,0 +1 @@
+Added `SessionManager` handing out pooled `API` instances which reuse the session token persisted by `FileTokenStore` instead of login
@@ -0,0 +1 @@
+Added `retry` and `circuit_breaker` parameters to `API` repeating failed idempotent requests with backoff and logging in again when the session expires, and `resume` parameter of `DataSet.to_csv` and `DataSet.to_jsonl`
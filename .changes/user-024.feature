@@ -0,0 +1 @@
+Added `RequestLimiter` limiting the rate and concurrency of `API` requests globally and by request class and reporting the time requests waited
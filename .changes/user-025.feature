@@ -0,0 +1 @@
+Added `Cluster` balancing dataset reads, previews, execution statistics and scheduler tasks between servers holding replicas of the same projects
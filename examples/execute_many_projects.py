@@ -0,0 +1,19 @@
+"""
+Execute, save and unload several projects concurrently and print timings.
+"""
+import polyanalyst6api
+
+server_url = ''  # protocol, domain, port : https://www.example.com/ or https://localhost:5043/
+username = ''
+password = ''
+projects = {
+    '': ['Python'],  # project uuid: names of the nodes to execute
+}
+
+
+with polyanalyst6api.API(server_url, username, password) as api:
+    runs = api.run_projects(projects.items(), max_workers=4)
+
+    for run in sorted(runs, key=lambda run: run.total, reverse=True):
+        steps = ', '.join(f'{step} {seconds:.1f}s' for step, seconds in run.timings.items())
+        print(f'{run.uuid}: {steps}' + ('' if run.ok else f' FAILED: {run.error}'))
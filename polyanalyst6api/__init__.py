@@ -1,4 +1,10 @@
 __version__ = '0.20.0'
 
 from .api import *
+from .cache import *
 from .exceptions import *
+from .limits import *
+from .metrics import *
+from .retry import *
+from .session import *
+from .waiter import *
@@ -0,0 +1,618 @@
+"""
+polyanalyst6api.aio
+~~~~~~~~~~~~~~~~~~~
+
+This module contains asyncio counterparts of :class:`API`, :class:`Project`,
+:class:`DataSet` and :class:`Drive`. It requires `aiohttp` package.
+"""
+import asyncio
+import base64
+import contextlib
+import datetime
+import functools
+import os
+import json
+import ssl
+import time
+from typing import Any, AsyncIterator, Callable, Dict, IO, List, Optional, Tuple, Union
+from urllib.parse import urljoin, urlparse
+
+from .api import _SID_HEADER_ENDPOINTS, API, _body_size, _error_message, _is_json, _json_loads
+from .exceptions import APIException, ClientException, _WrapperNotFound
+from .metrics import RequestEvent
+from .project import _DEFAULT_CHUNK_SIZE, _ROW_TYPES, JSON_VAL, Node, Project, _parse_wave_id, _RowIterator
+from .waiter import Waiter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+__all__ = ['AsyncAPI', 'AsyncProject', 'AsyncDataSet', 'AsyncDrive']
+
+
+class AsyncAPI:
+    """PolyAnalyst API client for asyncio applications.
+
+    The parameters are the same as in :class:`API` except for:
+
+    :param limit: (optional) max number of simultaneous connections. Default: ``100``
+    :param timeout: (optional) the total timeout of the request in seconds
+
+    Usage::
+
+      >>> async with AsyncAPI(URL, USERNAME, PASSWORD) as api:
+      ...     prj = await api.project(UUID)
+      ...     statuses = await asyncio.gather(*(prj.is_running(wave) for wave in waves))
+
+    .. versionadded:: 0.21.0
+    """
+
+    _api_path = API._api_path
+    _valid_api_versions = API._valid_api_versions
+    user_agent = API.user_agent
+
+    async def __aenter__(self) -> 'AsyncAPI':
+        await self.login()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await self.logout()
+        finally:
+            await self.close()
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str = '',
+        ldap_server: Optional[str] = None,
+        version: str = '1.0',
+        limit: int = 100,
+        timeout: Optional[float] = None,
+        hooks: Optional[List[Callable[[RequestEvent], None]]] = None,
+    ) -> None:
+        if aiohttp is None:
+            raise ClientException('aiohttp is required for AsyncAPI. Install it with `pip install aiohttp`')
+
+        if version not in self._valid_api_versions:
+            raise ClientException('Valid api versions are ' + ', '.join(self._valid_api_versions))
+
+        if not url:
+            raise ClientException(f'Invalid url: "{url}".')
+
+        self.base_url = urljoin(url, self._api_path)
+        self.url = urljoin(self.base_url, f'v{version}/')
+        self.username = username
+        self.password = password
+        self.ldap_server = ldap_server
+        self.limit = limit
+        self.timeout = timeout
+        self.hooks: List[Callable[[RequestEvent], None]] = list(hooks or [])
+
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._headers: Dict[str, str] = {}
+        self.sid = None  # session identity
+        # path to certificate file. by default ignore insecure connection warnings.
+        # it's applied to the http session created by the first request
+        self.certfile = False
+        self.drive = AsyncDrive(self)
+
+    async def close(self) -> None:
+        """Closes the underlying http session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_versions(self) -> List[str]:
+        """Returns api versions supported by PolyAnalyst server."""
+        try:
+            return (await self.request(urljoin(self.base_url, 'versions'), method='get'))[1]
+        except APIException:
+            return ['1.0']
+
+    async def get_server_info(self) -> Optional[Dict[str, Union[int, str, Dict[str, str]]]]:
+        """Returns general server information including build number, version and commit hashes."""
+        _, data = await self.request(urljoin(self.url, 'server/info'), method='get')
+        return data
+
+    async def login(self) -> None:
+        """Logs in to PolyAnalyst Server with user credentials."""
+        credentials = {'uname': self.username, 'pwd': self.password}
+        if self.ldap_server:
+            credentials['useLDAP'] = '1'
+            credentials['svr'] = self.ldap_server
+
+        resp, _ = await self.request('login', method='post', params=credentials)
+
+        if 'sid' in resp.cookies:
+            self.sid = resp.cookies['sid'].value
+        else:
+            self._headers['Authorization'] = f"Bearer {resp.headers['x-session-id']}"
+
+    async def logout(self) -> None:
+        """Logs out current user from PolyAnalyst server."""
+        await self.get('logout')
+
+    async def run_task(self, id: int) -> None:
+        """Initiates scheduler task execution.
+
+        :param id: the task ID
+        """
+        await self.post('scheduler/run-task', json={'taskId': id})
+
+    async def project(self, uuid: str, node_list_ttl: Optional[float] = None, lazy: bool = False) -> 'AsyncProject':
+        """Returns :class:`AsyncProject` instance with given uuid.
+
+        See :meth:`API.project` for parameters.
+        """
+        prj = AsyncProject(self, uuid, node_list_ttl)
+        if not lazy:
+            await prj._update_node_list()  # check that the project with given uuid exists
+        return prj
+
+    async def get(self, endpoint: str, **kwargs) -> Any:
+        """Shortcut for GET requests via :meth:`request <AsyncAPI.request>`"""
+        return (await self.request(endpoint, method='get', **kwargs))[1]
+
+    async def post(self, endpoint: str, **kwargs) -> Any:
+        """Shortcut for POST requests via :meth:`request <AsyncAPI.request>`"""
+        return (await self.request(endpoint, method='post', **kwargs))[1]
+
+    async def request(self, url: str, method: str, **kwargs) -> Tuple['aiohttp.ClientResponse', Any]:
+        """Sends ``method`` request to ``endpoint`` and returns tuple of
+        :class:`aiohttp.ClientResponse` with read body and json-encoded content of a response.
+
+        :param url: url or PolyAnalyst API endpoint
+        :param method: request method (e.g. GET, POST)
+        :param kwargs: :meth:`aiohttp.ClientSession.request` keyword arguments
+        """
+        return self._handle_response(*await self._send(url, method, **kwargs))
+
+    async def _send(self, url: str, method: str, **kwargs) -> Tuple['aiohttp.ClientResponse', bytes]:
+        if not urlparse(url).netloc:
+            url = urljoin(self.url, url)
+        kwargs['headers'] = {**self._headers, **(kwargs.get('headers') or {})}
+        if self.sid and self._endpoint(url) in _SID_HEADER_ENDPOINTS:
+            kwargs['headers']['sid'] = self.sid
+        started = time.perf_counter()
+        resp = body = None
+        try:
+            async with self._get_session().request(method, url, **kwargs) as resp:
+                body = await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            raise ClientException(exc)
+        finally:
+            if self.hooks:
+                sent = kwargs.get('data')
+                if sent is None and kwargs.get('json') is not None:
+                    sent = json.dumps(kwargs['json'])
+                self._emit(RequestEvent(
+                    method.upper(),
+                    self._endpoint(str(url)),
+                    None if body is None else resp.status,
+                    time.perf_counter() - started,
+                    _body_size(sent),
+                    0 if body is None else len(body),
+                ))
+        return resp, body
+
+    _emit = API._emit
+    _endpoint = API._endpoint
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        # the session should be created inside of the running event loop
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers={'User-Agent': self.user_agent},
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    ssl=ssl.create_default_context(cafile=self.certfile) if self.certfile else False,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                # the default jar ignores cookies of servers addressed by ip
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+            )
+        return self._session
+
+    @staticmethod
+    def _handle_response(response: 'aiohttp.ClientResponse', body: bytes) -> Tuple['aiohttp.ClientResponse', Any]:
+        data = None
+        if _is_json(response.headers.get('Content-Type', '')):
+            with contextlib.suppress(ValueError):
+                data = _json_loads(body)
+
+        if response.status in (200, 202):
+            return response, data
+
+        def http_error() -> Optional[str]:
+            if response.status < 400:
+                return None
+            kind = 'Client' if response.status < 500 else 'Server'
+            return f'{response.status} {kind} Error: {response.reason} for url: {response.url}'
+
+        error_msg = _error_message(response.status, data, body.decode(errors='replace'), http_error)
+        if error_msg is not None:
+            raise APIException(error_msg, str(response.url), response.status)
+
+        return response, None
+
+
+class AsyncProject:
+    """The asyncio counterpart of :class:`Project`.
+
+    .. versionadded:: 0.21.0
+    """
+
+    # node list indexing is shared with the sync Project
+    _set_node_list = Project._set_node_list
+    _lookup_node = Project._lookup_node
+    _node_list_expired = Project._node_list_expired
+    invalidate_node_list = Project.invalidate_node_list
+
+    def __repr__(self):
+        return f'<AsyncProject [{self.uuid}]>'
+
+    def __init__(self, api: AsyncAPI, uuid: str, node_list_ttl: Optional[float] = None) -> None:
+        self.api = api
+        self.uuid = uuid
+        self.node_list_ttl = node_list_ttl
+        self._node_list: List[Node] = []
+        self._node_list_updated: Optional[float] = None
+        self._nodes_by_name: Dict[str, List[Node]] = {}
+        self._nodes_by_key: Dict[Tuple[str, str], Node] = {}
+        self._wrapper_guids: Dict[int, str] = {}
+        self._wrapper_guids_lock: Optional[asyncio.Lock] = None  # created in the loop of the first dataset request
+
+    async def get_node_list(self) -> List[Node]:
+        """Returns a list of project nodes."""
+        return (await self.api.get(
+            'project/nodes',
+            params={'prjUUID': self.uuid},
+        ))['nodes']
+
+    async def get_node(self, node: Union[str, Dict[str, str]]) -> Node:
+        """Returns the node information from the cached node list, see :meth:`Project.get_node`."""
+        return await self._find_node(node)
+
+    async def get_execution_stats(self) -> List[Node]:
+        """Returns nodes execution statistics."""
+        return (await self.api.get('project/execution-statistics', params={'prjUUID': self.uuid}))['nodes']
+
+    async def get_tasks(self) -> List[Dict[str, Any]]:
+        """Returns task list info."""
+        data = await self.api.get('project/tasks', params={'prjUUID': self.uuid})
+        for task in data:
+            task['startTime'] = datetime.datetime.utcfromtimestamp(task['startTime'] / 1000)
+        return data
+
+    async def save(self) -> None:
+        """Initiates saving of all changes that have been made in the project."""
+        await self.api.post('project/save', json={'prjUUID': self.uuid})
+
+    async def abort(self) -> None:
+        """Aborts the execution of all nodes in the project."""
+        await self.api.post('project/global-abort', json={'prjUUID': self.uuid})
+
+    async def unload(self) -> None:
+        """Unload the project from the memory and free system resources."""
+        await self.api.post('project/unload', json={'prjUUID': self.uuid})
+
+    async def repair(self) -> None:
+        """Initiate the project repairing operation."""
+        await self.api.post('project/repair', json={'prjUUID': self.uuid})
+
+    async def delete(self, force_unload: bool = False) -> None:
+        """Delete the project from server, see :meth:`Project.delete`."""
+        await self.api.post('project/delete', json={'prjUUID': self.uuid, 'forceUnload': force_unload})
+
+    async def execute(self, *args: Union[str, Dict[str, str]], wait: Union[bool, Waiter] = False) -> Optional[int]:
+        """Initiates execution of nodes and returns execution wave identifier, see :meth:`Project.execute`."""
+        nodes = []
+        for arg in args:
+            node = await self._find_node(arg)
+            nodes.append({'name': node['name'], 'type': node['type']})
+
+        resp, _ = await self.api.request(
+            'project/execute',
+            method='post',
+            json={'prjUUID': self.uuid, 'nodes': nodes},
+        )
+        self.invalidate_node_list()  # node statuses are changed by the execution
+
+        wave_id = _parse_wave_id(resp.headers.get('location'))
+        if wait:
+            await self.wait(-1 if wave_id is None else wave_id, wait if isinstance(wait, Waiter) else None)
+        return wave_id
+
+    async def is_running(self, wave_id: int) -> bool:
+        """Checks that execution wave is still running in the project, see :meth:`Project.is_running`."""
+        data = await self.api.get(
+            'project/is-running',
+            params={'prjUUID': self.uuid, 'executionWave': wave_id},
+        )
+        return bool(data['result'])
+
+    async def wait(self, wave_id: int, waiter: Optional[Waiter] = None) -> float:
+        """Waits for the execution wave to complete, see :meth:`Project.wait`."""
+        if waiter is None:
+            waiter = Waiter()
+        on_timeout = self.abort if waiter.abort_on_timeout else None
+        return await waiter.wait_async(lambda: self.is_running(wave_id), on_timeout)
+
+    async def dataset(self, node: Union[str, Dict[str, str]]) -> 'AsyncDataSet':
+        """Get dataset wrapper object.
+
+        :param node: node name or dict with name and type of the node
+        """
+        return AsyncDataSet(self, await self._find_node(node))
+
+    async def _update_node_list(self) -> None:
+        self._set_node_list(await self.get_node_list())
+
+    async def _find_node(self, node_: Union[str, Dict[str, str]]) -> Node:
+        if self._node_list_expired():
+            await self._update_node_list()
+        return self._lookup_node(node_)
+
+
+def _retry_on_invalid_guid(func):
+    @functools.wraps(func)
+    async def wrapper(cls, *args, **kwargs):
+        if not cls.guid:
+            await cls._update_guid('')
+        guid = cls.guid
+        try:
+            return await func(cls, *args, **kwargs)
+        except _WrapperNotFound:
+            await cls._update_guid(guid)
+            return await func(cls, *args, **kwargs)
+    return wrapper
+
+
+class _WindowFeed:
+    """The iterator of windows for :class:`_RowIterator` which are put by the async code."""
+
+    def __init__(self):
+        self.window: Optional[Tuple[int, List]] = None
+
+    def __next__(self) -> Tuple[int, List]:
+        window, self.window = self.window, None
+        if window is None:
+            raise StopIteration
+        return window
+
+    def close(self) -> None:
+        self.window = None
+
+
+class AsyncDataSet:
+    """The asyncio counterpart of :class:`DataSet`.
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, prj: AsyncProject, node: Node):
+        self._prj = prj
+        self._api = prj.api
+        self._node = node
+        self.guid: str = prj._wrapper_guids.get(node['id'], '')
+
+    @_retry_on_invalid_guid
+    async def get_info(self) -> Dict[str, Any]:
+        """Get information about dataset."""
+        return await self._api.get('dataset/info', params={'wrapperGuid': self.guid})
+
+    @_retry_on_invalid_guid
+    async def get_progress(self) -> Dict[str, Union[int, str]]:
+        """Get dataset progress."""
+        return await self._api.get('dataset/progress', params={'wrapperGuid': self.guid})
+
+    async def preview(self) -> List[Dict[str, Any]]:
+        """Returns first 1000 rows with strings truncated to 250 characters."""
+        return await self._api.get(
+            'dataset/preview',
+            params={'prjUUID': self._prj.uuid, 'name': self._node['name'], 'type': self._node['type']},
+        )
+
+    async def iter_rows(
+        self,
+        start: int = 0,
+        stop: Optional[int] = None,
+        chunk_size: int = _DEFAULT_CHUNK_SIZE,
+        text_concurrency: int = 8,
+        row_type: str = 'dict',
+    ) -> AsyncIterator[Union[Dict[str, JSON_VAL], Tuple[JSON_VAL, ...]]]:
+        """
+        Iterate over rows in dataset downloading them window by window. The next
+        window is downloaded while rows of the current one are consumed.
+
+        :param start: the index of the first row
+        :param stop: the index of the row to stop at (not included)
+        :param chunk_size: (optional) the number of rows requested from the server at once
+        :param text_concurrency: (optional) max number of simultaneous requests \
+            of `getTextAlways` columns texts
+        :param row_type: (optional) the type of rows, see :meth:`DataSet.iter_rows`
+
+        :raises: ValueError if `start` or `stop` is out of datasets' row range or \
+            other parameters are invalid
+
+        Usage::
+
+          >>> async for row in ds.iter_rows(chunk_size=50_000):
+          ...     process(row)
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
+        if text_concurrency < 1:
+            raise ValueError('text_concurrency must be a positive integer')
+        if row_type not in _ROW_TYPES:
+            raise ValueError(f"row_type must be one of: {', '.join(_ROW_TYPES)}")
+
+        info = await self.get_info()
+        max_row = info['rowCount']
+        if stop is None:
+            stop = max_row
+        if not 0 <= start <= stop <= max_row:
+            raise ValueError(f'start and stop arguments must be within dataset row range: (0, {max_row})')
+
+        text_columns = [c for c in info['columnsInfo'] if c['flags'].get('getTextAlways')]
+        semaphore = asyncio.Semaphore(text_concurrency)
+
+        async def get_text(row: int, column: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self._cell_text(row, column['id'], column['title'])
+
+        async def get_window(offset: int) -> List:
+            table = (await self._values(min(chunk_size, stop - offset), offset))['table']
+            if text_columns:
+                texts = iter(await asyncio.gather(*(
+                    get_text(offset + i, column) for i in range(len(table)) for column in text_columns
+                )))
+                table = [list(row) for row in table]
+                for row in table:
+                    for column in text_columns:
+                        row[column['id']] = next(texts)
+            return table
+
+        feed = _WindowFeed()
+        rows = _RowIterator(info, feed, None, start, stop, 0, row_type)
+        offsets = range(start, stop, chunk_size)
+        pending = asyncio.ensure_future(get_window(offsets[0])) if offsets else None
+        try:
+            for i, offset in enumerate(offsets):
+                table = await pending
+                pending = asyncio.ensure_future(get_window(offsets[i + 1])) if i + 1 < len(offsets) else None
+                feed.window = (offset, table)
+                for _ in range(len(table)):
+                    yield next(rows)
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def _update_guid(self, expired: str) -> None:
+        """Takes the guid from the project cache or requests the new one if cached guid is
+        missing or is the `expired` one (i.e. its' wrapper is not found)."""
+        guids = self._prj._wrapper_guids
+        if self._prj._wrapper_guids_lock is None:
+            self._prj._wrapper_guids_lock = asyncio.Lock()
+        async with self._prj._wrapper_guids_lock:
+            guid = guids.get(self._node['id'])
+            if not guid or guid == expired:
+                guid = guids[self._node['id']] = (await self._api.get(
+                    'dataset/wrapper-guid',
+                    params={'prjUUID': self._prj.uuid, 'obj': self._node['id']},
+                ))['wrapperGuid']
+            self.guid = guid
+
+    @_retry_on_invalid_guid
+    async def _values(self, row_count: int, offset: int = 0) -> Dict[str, Union[List, Dict]]:
+        payload = {'wrapperGuid': self.guid, 'rowCount': row_count}
+        if offset:
+            payload['offset'] = offset
+        return await self._api.get('dataset/values', json=payload)
+
+    @_retry_on_invalid_guid
+    async def _cell_text(self, row: int, col: int, _title) -> str:
+        return (await self._api.get(
+            'dataset/cell-text',
+            json={'wrapperGuid': self.guid, 'row': row, 'col': col, 'colTitle': _title, 'offset': 0, 'count': 0},
+        ))['text']
+
+
+class AsyncDrive:
+    """The asyncio counterpart of :class:`Drive`.
+
+    .. versionadded:: 0.21.0
+    """
+
+    _tus_version = '1.0.0'
+
+    def __init__(self, api: AsyncAPI):
+        self.api = api
+
+    async def create_folder(self, name: str, path: str = '') -> None:
+        """Create a new folder inside the PolyAnalyst's user directory."""
+        await self.api.post('folder/create', json={'path': path, 'name': name})
+
+    async def delete_folder(self, name: str, path: str = '') -> None:
+        """Delete the folder in the PolyAnalyst's user directory."""
+        await self.api.post('folder/delete', json={'path': path, 'name': name})
+
+    async def delete_file(self, name: str, path: str = '') -> None:
+        """Delete the file in the PolyAnalyst's user directory."""
+        await self.api.post('file/delete', json={'path': path, 'name': name})
+
+    async def download_file(self, name: str, path: str = '') -> bytes:
+        """Download the binary content of the file."""
+        data = await self.api.post('file/download', json={'path': path, 'name': name})
+        resp, content = await self.api._send(
+            urljoin(self.api.url, '/polyanalyst/download'),
+            method='get',
+            params={'uid': data['uid']},
+        )
+        if resp.status != 200:
+            self.api._handle_response(resp, content)
+        return content
+
+    async def upload_file(
+        self,
+        file: IO,
+        name: Optional[str] = None,
+        path: str = '',
+        chunk_size: int = 4 << 20,
+    ) -> None:
+        """
+        Upload the file to the PolyAnalyst's user directory using tus protocol.
+
+        The file is read synchronously by `chunk_size` bytes.
+
+        :param file: the file or file-like object opened in binary mode
+        :param name: the filename other than `file`'s name
+        :param path: (optional) a relative path of the file's parent directory
+        :param chunk_size: (optional) the size of uploaded parts. Default: 4 MiB
+        """
+        file_name = name or os.path.basename(file.name)
+        pos = file.tell()
+        file_size = file.seek(0, os.SEEK_END) - pos
+        file.seek(pos)
+
+        metadata = {'foldername': path, 'filename': file_name}
+        resp, _ = await self.api.request(
+            'file/upload',
+            method='post',
+            headers={
+                'Tus-Resumable': self._tus_version,
+                'Upload-Length': str(file_size),
+                'Upload-Metadata': ','.join(
+                    f'{k} {base64.b64encode(v.encode()).decode()}' for k, v in metadata.items()
+                ),
+            },
+        )
+        if resp.status != 201:
+            raise APIException('File upload creation failed', str(resp.url), resp.status)
+        endpoint = urljoin(str(resp.url), resp.headers['Location'])
+
+        offset = 0
+        try:
+            while offset < file_size:
+                chunk = file.read(chunk_size)
+                resp, _ = await self.api.request(
+                    endpoint,
+                    method='patch',
+                    data=chunk,
+                    headers={
+                        'Tus-Resumable': self._tus_version,
+                        'Upload-Offset': str(offset),
+                        'Content-Type': 'application/offset+octet-stream',
+                    },
+                )
+                offset = int(resp.headers['Upload-Offset'])
+        finally:
+            # free up resources on the server if file is not uploaded completely
+            if offset != file_size or file_size == 0:
+                try:
+                    await self.api.request(endpoint, method='delete', headers={'Tus-Resumable': self._tus_version})
+                except (APIException, ClientException):
+                    pass
@@ -5,20 +5,42 @@ polyanalyst6api.api
 This module contains functionality for access to PolyAnalyst API.
 """
 import contextlib
+import copy
+import json
+import logging
+import threading
+import time
 import warnings
-from typing import Any, Dict, List, Tuple, Union, Optional
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple, Union, Optional
 from urllib.parse import urljoin, urlparse
 
 import requests
+import requests.adapters
 import urllib3
 
 from . import __version__
+from .batch import ProjectRun, run_projects
 from .drive import Drive
+from .limits import RequestLimiter
+from .metrics import RequestEvent
 from .project import Parameters, Project
-from .exceptions import APIException, ClientException, _WrapperNotFound
+from .retry import CircuitBreaker, RetryPolicy, _is_transient, _session_expired
+from .waiter import Waiter
+from .watcher import WaveWatcher
+from .exceptions import APIException, ClientException, PAException, _WrapperNotFound
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 __all__ = ['API']
 
+logger = logging.getLogger(__name__)
+
+# the server checks the session of these endpoints by the sid header besides the cookie
+_SID_HEADER_ENDPOINTS = frozenset({'project/nodes'})
+
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 warnings.simplefilter('always', UserWarning)  # without this set_parameters will show warnings only once
 
@@ -55,9 +77,38 @@ class API:
     :param password: (optional) The password for specified username
     :param ldap_server: (optional) LDAP Server address
     :param version: (optional) Choose which PolyAnalyst API version to use. Default: ``1.0``
+    :param max_parallel_downloads: (optional) max number of concurrent dataset \
+        downloads from the server. Default: ``4``
+    :param pool_connections: (optional) the number of connection pools (one per \
+        host) to cache. Default: ``10``
+    :param pool_maxsize: (optional) max number of connections kept open to the \
+        server. Default: ``10``
+    :param pool_block: (optional) wait for a free connection instead of opening \
+        the extra one when all ``pool_maxsize`` connections are busy. Default: ``False``
+    :param keep_alive: (optional) reuse connections between requests. Default: ``True``
+    :param timeout: (optional) the default :func:`requests.request` timeout, \
+        either seconds or (connect, read) tuple. By default wait forever.
+    :param hooks: (optional) callables which are called with :class:`RequestEvent` \
+        after every request, e.g. :class:`RequestMetrics`
+    :param coalesce: (optional) share one round trip between concurrent identical \
+        GET requests to ``coalesced_endpoints``. Default: ``False``
+    :param coalesce_ttl: (optional) the number of seconds the coalesced response \
+        is reused for. Any other than GET request drops reused responses. Default: ``0``
+    :param retry: (optional) the :class:`RetryPolicy` of failed requests. By default \
+        requests are not repeated
+    :param circuit_breaker: (optional) the :class:`CircuitBreaker` suspending \
+        requests to the failing server
+    :param limiter: (optional) the :class:`RequestLimiter` of the request rate \
+        and concurrency, it may be shared by instances connected to the same server
 
     If ldap_server is provided, then login will be performed via LDAP Server.
 
+    The instance is thread-safe: it can be shared by any number of threads
+    working with projects, datasets and drive concurrently. All requests go
+    through the same connection pool, so set ``pool_maxsize`` to the number of
+    threads to avoid reconnecting, or set ``pool_block`` to limit the number
+    of connections to the server.
+
     Usage::
 
       >>> with API(URL, USERNAME, PASSWORD) as api:
@@ -65,6 +116,16 @@ class API:
     """
 
     _api_path = '/polyanalyst/api/'
+    # idempotent GET endpoints which responses may be shared between callers
+    coalesced_endpoints = frozenset({
+        'dataset/info',
+        'dataset/progress',
+        'project/execution-statistics',
+        'project/is-running',
+        'project/nodes',
+        'project/tasks',
+        'server/info',
+    })
     _valid_api_versions = ['1.0']
     user_agent = f'PolyAnalyst6API python client v{__version__}'
 
@@ -73,6 +134,8 @@ class API:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._watcher is not None:
+            self._watcher.stop()
         self.logout()
         self._s.__exit__()
 
@@ -83,6 +146,18 @@ class API:
         password: str = '',
         ldap_server: Optional[str] = None,
         version: str = '1.0',
+        max_parallel_downloads: int = 4,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        timeout: Optional[Union[float, Tuple[float, float]]] = None,
+        hooks: Optional[List[Callable[[RequestEvent], None]]] = None,
+        coalesce: bool = False,
+        coalesce_ttl: float = 0,
+        retry: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        limiter: Optional[RequestLimiter] = None,
     ) -> None:
         if version not in self._valid_api_versions:
             raise ClientException('Valid api versions are ' + ', '.join(self._valid_api_versions))
@@ -95,13 +170,44 @@ class API:
         self.username = username
         self.password = password
         self.ldap_server = ldap_server
+        self.max_parallel_downloads = max_parallel_downloads
+        # limits number of dataset windows downloaded at once by all DataSet instances
+        self._download_slots = threading.BoundedSemaphore(max_parallel_downloads)
+
+        self.timeout = timeout
+        self.hooks: List[Callable[[RequestEvent], None]] = list(hooks or [])
+        self._single_flight = _SingleFlight(coalesce_ttl) if coalesce else None
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
+        self.limiter = limiter
+        self._lock = threading.RLock()  # guards login state and lazily created attributes
 
         self._s = requests.Session()
         self._s.headers.update({'User-Agent': self.user_agent})
+        if not keep_alive:
+            self._s.headers['Connection'] = 'close'
+        adapter = requests.adapters.HTTPAdapter(pool_connections, pool_maxsize, pool_block=pool_block)
+        self._s.mount('http://', adapter)
+        self._s.mount('https://', adapter)
         self.sid = None  # session identity
         # path to certificate file. by default ignore insecure connection warnings
         self.certfile = False
         self.drive = Drive(self)
+        self._watcher: Optional[WaveWatcher] = None
+        self._server_info: Optional[Dict[str, Any]] = None
+        # directory to store Parameters.schema() between runs. by default it's cached only in memory
+        self.parameters_cache_dir: Optional[str] = None
+
+    @property
+    def watcher(self) -> WaveWatcher:
+        """The :class:`WaveWatcher <WaveWatcher>` shared by all projects of this instance.
+
+        .. versionadded:: 0.21.0
+        """
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = WaveWatcher(self)
+            return self._watcher
 
     @property
     def fs(self):
@@ -121,6 +227,13 @@ class API:
         _, data = self.request(urljoin(self.url, 'server/info'), method='get')
         return data
 
+    def _get_server_info_cached(self) -> Dict[str, Any]:
+        # server build can't change without restart which invalidates the session
+        with self._lock:
+            if self._server_info is None:
+                self._server_info = self.get_server_info() or {}
+            return self._server_info
+
     def get_parameters(self) -> List[Dict[str, Union[str, List]]]:
         """
         Returns list of nodes with parameters supported by ``Parameters`` node.
@@ -142,12 +255,41 @@ class API:
             credentials['useLDAP'] = '1'
             credentials['svr'] = self.ldap_server
 
-        resp, _ = self.request('login', method='post', params=credentials)
+        with self._lock:
+            resp, _ = self.request('login', method='post', params=credentials)
 
-        try:
-            self.sid = resp.cookies['sid']
-        except KeyError:
-            self._s.headers['Authorization'] = f"Bearer {resp.headers['x-session-id']}"
+            try:
+                self.sid = resp.cookies['sid']
+            except KeyError:
+                self._s.headers['Authorization'] = f"Bearer {resp.headers['x-session-id']}"
+
+    def session_token(self) -> Optional[Dict[str, str]]:
+        """Returns the token of the current session or None if the user is not logged in.
+
+        The token may be passed to :meth:`restore_session` of another instance
+        to reuse the session without login, see :class:`SessionManager`.
+
+        .. versionadded:: 0.21.0
+        """
+        with self._lock:
+            if self.sid:
+                return {'sid': self.sid}
+            auth = self._s.headers.get('Authorization', '')
+            if auth.startswith('Bearer '):
+                return {'bearer': auth[len('Bearer '):]}
+            return None
+
+    def restore_session(self, token: Dict[str, str]) -> None:
+        """Uses the session of the token returned by :meth:`session_token` instead of login.
+
+        .. versionadded:: 0.21.0
+        """
+        with self._lock:
+            if 'sid' in token:
+                self.sid = token['sid']
+                self._s.cookies.set('sid', token['sid'])
+            else:
+                self._s.headers['Authorization'] = f"Bearer {token['bearer']}"
 
     def logout(self) -> None:
         """Logs out current user from PolyAnalyst server."""
@@ -160,15 +302,38 @@ class API:
         """
         self.post('scheduler/run-task', json={'taskId': id})
 
-    def project(self, uuid: str) -> Project:
+    def project(self, uuid: str, node_list_ttl: Optional[float] = None, lazy: bool = False) -> Project:
         """Returns :class:`Project <Project>` instance with given uuid.
 
         :param uuid: The project uuid
+        :param node_list_ttl: (optional) the number of seconds the project node list is cached for
+        :param lazy: (optional) do not request the node list (and so do not check \
+            that the project exists) until the first node lookup
+
+        .. versionchanged:: 0.21.0
+            Added `node_list_ttl` and `lazy` parameters.
         """
-        prj = Project(self, uuid)
-        prj._update_node_list()  # check that the project with given uuid exists
+        prj = Project(self, uuid, node_list_ttl)
+        if not lazy:
+            prj._update_node_list()  # check that the project with given uuid exists
         return prj
 
+    def run_projects(
+        self,
+        jobs: Iterable[Tuple[str, Sequence[Union[str, Dict[str, str]]]]],
+        max_workers: int = 4,
+        save: bool = True,
+        unload: bool = True,
+        waiter: Optional[Waiter] = None,
+    ) -> List[ProjectRun]:
+        """Executes, saves and unloads many projects concurrently.
+
+        See :func:`run_projects <polyanalyst6api.batch.run_projects>` for details.
+
+        .. versionadded:: 0.21.0
+        """
+        return run_projects(self, jobs, max_workers, save, unload, waiter)
+
     def get(self, endpoint: str, **kwargs) -> Any:
         """Shortcut for GET requests via :meth:`request <API.request>`
 
@@ -185,58 +350,341 @@ class API:
         """
         return self.request(endpoint, method='post', **kwargs)[1]
 
-    def request(self, url: str, method: str, **kwargs) -> Tuple[requests.Response, Any]:
+    def request(self, url: str, method: str, decode: bool = True, **kwargs) -> Tuple[requests.Response, Any]:
         """Sends ``method`` request to ``endpoint`` and returns tuple of
         :class:`requests.Response` and json-encoded content of a response.
 
         :param url: url or PolyAnalyst API endpoint
         :param method: request method (e.g. GET, POST)
+        :param decode: (optional) decode json content of the successful response. \
+            Pass ``False`` for file contents. Default: ``True``
         :param kwargs: :func:`requests.request` keyword arguments
+
+        .. versionchanged:: 0.21.0
+            The successful response with ``stream=True`` is returned without
+            reading its body, and the body of a binary response isn't decoded as json.
+            Identical GET requests are coalesced if the instance is created with ``coalesce=True``.
+            Added `decode` parameter.
         """
         if not urlparse(url).netloc:
             url = urljoin(self.url, url)
+
+        if self._single_flight is not None:
+            if method.lower() != 'get':
+                self._single_flight.clear()  # the request may change the results of cached ones
+            elif self._endpoint(url) in self.coalesced_endpoints and decode and not kwargs.get('stream'):
+                key = _request_key(url, kwargs)
+                if key is not None:
+                    return self._single_flight.call(key, lambda: self._send(url, method, **kwargs))
+
+        return self._send(url, method, decode, **kwargs)
+
+    def _send(self, url: str, method: str, decode: bool = True, **kwargs) -> Tuple[requests.Response, Any]:
         kwargs['verify'] = self.certfile
+        kwargs.setdefault('timeout', self.timeout)
+        retry, breaker = self.retry, self.circuit_breaker
+        if retry is None and breaker is None:
+            return self._attempt(url, method, 0, decode, **kwargs)
+
+        endpoint = self._endpoint(url)
+        statuses = retry.statuses if retry is not None else (502, 503, 504)
+        delays = None
+        attempt = 0
+        relogged = False
+        while True:
+            if breaker is not None:
+                breaker._before()
+            token = self.session_token()
+            ok = None
+            try:
+                result = self._attempt(url, method, attempt, decode, **kwargs)
+                ok = True
+                return result
+            except PAException as exc:
+                ok = not _is_transient(exc, statuses)
+                if retry is None:
+                    raise
+                if retry.relogin and not relogged and endpoint != 'login' and _session_expired(exc):
+                    relogged = True
+                    self._relogin(token)
+                elif not ok and attempt < retry.retries and retry.is_idempotent(method, endpoint):
+                    if delays is None:
+                        delays = retry.backoff.delays()
+                    time.sleep(next(delays))
+                else:
+                    raise
+            finally:
+                if breaker is not None:
+                    breaker._record(ok)
+            attempt += 1
+
+    def _relogin(self, token: Optional[Dict[str, str]]) -> None:
+        # the session may have been renewed by the concurrent request already
+        with self._lock:
+            if self.session_token() == token:
+                self.login()
+
+    def _attempt(
+        self,
+        url: str,
+        method: str,
+        attempt: int,
+        decode: bool = True,
+        **kwargs,
+    ) -> Tuple[requests.Response, Any]:
+        endpoint = self._endpoint(url)
+        if self.sid and endpoint in _SID_HEADER_ENDPOINTS:
+            # taken on every attempt, so the retry after re-login sends the new session
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), 'sid': self.sid}
+        kind, waited = self.limiter._acquire(method, endpoint) if self.limiter is not None else (None, 0.0)
+        started = time.perf_counter()
+        resp = None
+        held = False
         try:
-            resp = self._s.request(method, url, **kwargs)
+            try:
+                resp = self._s.request(method, url, **kwargs)
+                if kind is not None and kwargs.get('stream'):
+                    # the body is transferred after the return, so the slot is held until it's closed
+                    resp.close = _on_close(resp.close, lambda: self.limiter._release(kind))
+                    held = True
+            finally:
+                if kind is not None and not held:
+                    self.limiter._release(kind)
         except requests.RequestException as exc:
-            raise ClientException(exc)
+            raise ClientException(exc) from exc
         else:
-            return self._handle_response(resp)
+            try:
+                return self._handle_response(resp, stream=kwargs.get('stream', False), decode=decode)
+            except BaseException:
+                resp.close()
+                raise
+        finally:
+            if self.hooks:
+                self._emit(RequestEvent(
+                    method.upper(),
+                    endpoint,
+                    None if resp is None else resp.status_code,
+                    time.perf_counter() - started,
+                    0 if resp is None else _body_size(resp.request.body),
+                    0 if resp is None else _content_size(resp),
+                    attempt,
+                    waited,
+                ))
+
+    def _emit(self, event: RequestEvent) -> None:
+        for hook in self.hooks:
+            # the failed hook must not replace the response or the error of the request
+            try:
+                hook(event)
+            except Exception:
+                logger.warning('Request hook %r failed', hook, exc_info=True)
+
+    def _endpoint(self, url: str) -> str:
+        url = url.split('?', 1)[0]
+        if not url.startswith(self.url):
+            return urlparse(url).path
+        endpoint = url[len(self.url):]
+        if endpoint.startswith('file/upload/'):
+            return 'file/upload/{id}'  # tus upload parts are sent to the url of the created upload
+        return endpoint
 
     @staticmethod
-    def _handle_response(response: requests.Response) -> Tuple[requests.Response, Any]:
-        try:
-            json = response.json()
-        except ValueError:
-            json = None
+    def _handle_response(
+        response: requests.Response,
+        stream: bool = False,
+        decode: bool = True,
+    ) -> Tuple[requests.Response, Any]:
+        if (stream or not decode) and response.status_code in (200, 202):
+            return response, None  # the caller consumes the body
+
+        json = None
+        if _is_json(response.headers.get('Content-Type', '')):
+            with contextlib.suppress(ValueError):
+                json = _json_loads(response.content)
 
         if response.status_code in (200, 202):
             return response, json
 
-        if isinstance(json, dict) and json.get('error'):
-            with contextlib.suppress(KeyError):
-                error = json['error']
-                if 'The wrapper with the given GUID is not found on the server' == error['message']:
-                    raise _WrapperNotFound
-                error_msg = f"{error['title']}. Message: '{error['message']}'"
-
-        # the old error response format handling
-        elif response.status_code == 403:
-            if 'are not logged in' in response.text:
-                error_msg = 'You are not logged in to PolyAnalyst Server'
-            elif 'operation is limited ' in response.text:
-                error_msg = 'Access to this operation is limited to project owners and administrator'
-        elif response.status_code == 500:
-            with contextlib.suppress(IndexError, TypeError):
-                if json[0] == 'Error':
-                    error_msg = json[1]
-        else:
+        def http_error() -> Optional[str]:
             try:
                 response.raise_for_status()
             except requests.HTTPError as exc:
-                error_msg = str(exc)
+                return str(exc)
+            return None
 
-        with contextlib.suppress(NameError):
+        error_msg = _error_message(response.status_code, json, response.text, http_error)
+        if error_msg is not None:
             raise APIException(error_msg, response.url, response.status_code)
 
         return response, None
+
+
+class _SingleFlight:
+    """Shares the result of the call between concurrent callers with the same key.
+
+    The leader makes the call while the others wait for its result. The
+    result is reused for `ttl` seconds after the call. Every caller gets the
+    deep copy of the decoded content, so callers may modify it. Expired
+    results are dropped when new calls are made, at most once per `ttl`.
+    """
+
+    def __init__(self, ttl: float = 0) -> None:
+        self.ttl = ttl
+        self._calls: Dict[Any, '_Call'] = {}
+        self._pruned = time.monotonic()
+        self._lock = threading.Lock()
+
+    def call(self, key: Any, func: Callable[[], Tuple[requests.Response, Any]]) -> Tuple[requests.Response, Any]:
+        with self._lock:
+            now = time.monotonic()
+            call = self._calls.get(key)
+            if call is not None and call.done.is_set() and call.expires <= now:
+                call = None
+            leader = call is None
+            if leader:
+                if now - self._pruned >= self.ttl:
+                    self._prune(now)
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+        else:
+            try:
+                call.result = func()
+            except BaseException as exc:
+                call.error = exc
+                raise
+            finally:
+                with self._lock:
+                    call.expires = time.monotonic() + self.ttl
+                    if call.error is not None or not self.ttl:
+                        if self._calls.get(key) is call:
+                            del self._calls[key]
+                call.done.set()
+
+        resp, data = call.result
+        return resp, copy.deepcopy(data)
+
+    def clear(self) -> None:
+        with self._lock:
+            # waiters of in-flight calls still get the result, but it's not reused after
+            self._calls.clear()
+
+    def _prune(self, now: float) -> None:
+        """Drops expired results. Must be called with the lock held."""
+        self._pruned = now
+        for key in [key for key, call in self._calls.items() if call.done.is_set() and call.expires <= now]:
+            del self._calls[key]
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'expires')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[Tuple[requests.Response, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.expires = float('inf')
+
+
+def _on_close(close: Callable[[], None], callback: Callable[[], None]) -> Callable[[], None]:
+    """Returns the `close` function calling `callback` once after the first call."""
+    called = False
+
+    def wrapper() -> None:
+        nonlocal called
+        try:
+            close()
+        finally:
+            if not called:
+                called = True
+                callback()
+    return wrapper
+
+
+def _request_key(url: str, kwargs: Dict[str, Any]) -> Optional[str]:
+    """Returns the key of the request or None if its arguments are not comparable."""
+    if kwargs.get('files') is not None or not isinstance(kwargs.get('data'), (bytes, str, type(None))):
+        return None
+    try:
+        return json.dumps(
+            [url, kwargs.get('params'), kwargs.get('json'), kwargs.get('data'), kwargs.get('headers')],
+            sort_keys=True,
+            default=str,
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def _body_size(body: Any) -> int:
+    return len(body) if isinstance(body, (bytes, str)) else 0
+
+
+def _content_size(response: requests.Response) -> int:
+    if response._content_consumed:
+        return len(response.content or b'')
+    # the streamed body is not read yet
+    return int(response.headers.get('Content-Length') or 0)
+
+
+def _is_json(content_type: str) -> bool:
+    """Checks whether the response body of `content_type` may be json-encoded.
+
+    Servers of old versions send json as text, so only binary responses are skipped.
+    """
+    mime = content_type.split(';', 1)[0].strip().lower()
+    return not mime or mime.startswith('text/') or mime == 'application/json' or mime.endswith('+json')
+
+
+def _json_loads(content: bytes) -> Any:
+    """Decodes json with orjson if it's installed.
+
+    orjson rejects NaN and Infinity which the server sends e.g. in dataset
+    values, only such documents are decoded again by :func:`json.loads`.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError as exc:
+            # other errors would be raised by json.loads too, so the content is not decoded twice
+            if not exc.doc[exc.pos:exc.pos + 9].lstrip('-').startswith(('NaN', 'Infinity')):
+                raise
+    return json.loads(content)
+
+
+def _error_message(
+    status_code: int,
+    json: Any,
+    text: str,
+    http_error: Callable[[], Optional[str]],
+) -> Optional[str]:
+    """Returns the error message of PolyAnalyst API response or None if it's not an error.
+
+    Shared by sync and async clients, `http_error` returns the generic message of
+    the http status code.
+
+    :raises: _WrapperNotFound if the dataset wrapper guid is expired
+    """
+    if isinstance(json, dict) and json.get('error'):
+        with contextlib.suppress(KeyError):
+            error = json['error']
+            if 'The wrapper with the given GUID is not found on the server' == error['message']:
+                raise _WrapperNotFound
+            return f"{error['title']}. Message: '{error['message']}'"
+
+    # the old error response format handling
+    elif status_code == 403:
+        if 'are not logged in' in text:
+            return 'You are not logged in to PolyAnalyst Server'
+        elif 'operation is limited ' in text:
+            return 'Access to this operation is limited to project owners and administrator'
+    elif status_code == 500:
+        with contextlib.suppress(IndexError, TypeError, KeyError):
+            if json[0] == 'Error':
+                return json[1]
+    else:
+        return http_error()
+
+    return None
@@ -0,0 +1,104 @@
+"""
+polyanalyst6api.batch
+~~~~~~~~~~~~~~~~~~~~~
+
+This module contains functionality for running many projects concurrently.
+"""
+import concurrent.futures
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .waiter import Waiter
+
+__all__ = ['ProjectRun', 'run_projects']
+
+NodeArg = Union[str, Dict[str, str]]
+
+
+class ProjectRun(NamedTuple):
+    """The result of the project pipeline run by :func:`run_projects`.
+
+    ``timings`` maps completed steps (``execute``, ``wait``, ``save``,
+    ``unload``) to their durations in seconds. ``error`` is the exception
+    which stopped the pipeline.
+    """
+    uuid: str
+    timings: Dict[str, float]
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+
+def run_projects(
+    api,
+    jobs: Iterable[Tuple[str, Sequence[NodeArg]]],
+    max_workers: int = 4,
+    save: bool = True,
+    unload: bool = True,
+    waiter: Optional[Waiter] = None,
+) -> List[ProjectRun]:
+    """
+    Runs execute -> wait -> save -> unload pipelines of many projects concurrently.
+
+    Failed pipelines do not affect other ones, the exception is returned in
+    the :class:`ProjectRun`. The project is
+    unloaded even if the previous steps have failed.
+
+    :param api: An instance of :class:`API <API>` class
+    :param jobs: pairs of the project uuid and the nodes to execute
+    :param max_workers: (optional) max number of projects processed at once. Default: ``4``
+    :param save: (optional) save the project after the execution. Default: ``True``
+    :param unload: (optional) unload the project at the end. Default: ``True``
+    :param waiter: (optional) polling strategy of the execution and saving
+
+    :returns: the list of :class:`ProjectRun` in the order of `jobs`
+
+    Usage::
+
+      >>> runs = api.run_projects([(uuid, ['Python', 'Export']) for uuid in uuids], max_workers=8)
+      >>> failed = [run for run in runs if not run.ok]
+
+    .. versionadded:: 0.21.0
+    """
+    def run(uuid: str, nodes: Sequence[NodeArg]) -> ProjectRun:
+        timings: Dict[str, float] = {}
+        error = None
+
+        def step(name, func, *args):
+            started = time.monotonic()
+            result = func(*args)
+            timings[name] = time.monotonic() - started
+            return result
+
+        prj = api.project(uuid, lazy=True)
+        try:
+            wave_id = step('execute', prj.execute, *nodes)
+            # old servers do not return the wave id, so wait for any operation in the project
+            step('wait', prj.wait, -1 if wave_id is None else wave_id, waiter)
+            if save:
+                step('save', _save, prj, waiter)
+        except Exception as exc:  # e.g. network errors and WaitTimeout also must not stop other pipelines
+            error = exc
+
+        if unload:
+            try:
+                step('unload', prj.unload)
+            except Exception as exc:
+                error = error or exc
+
+        return ProjectRun(uuid, timings, error)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(run, uuid, nodes) for uuid, nodes in jobs]
+        return [future.result() for future in futures]
+
+
+def _save(prj, waiter: Optional[Waiter]) -> None:
+    prj.save()
+    (waiter or Waiter()).wait(lambda: prj.is_running(-1))
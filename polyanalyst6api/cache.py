@@ -0,0 +1,184 @@
+"""
+polyanalyst6api.cache
+~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the persistent on-disk cache of datasets.
+"""
+import array
+import contextlib
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import pathlib
+import struct
+import threading
+import uuid as _uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+__all__ = ['DatasetCache']
+
+_MAGIC = b'PA6DSC'
+_FORMAT_VERSION = 1
+_HEAD = struct.Struct('<6sBBQ')  # magic, format version, marshal version, header length
+_TAIL = struct.Struct('<Q')  # the position of the rows index
+_SUFFIX = '.pads'
+
+
+class DatasetCache:
+    """Persistent on-disk cache of dataset rows and cell texts.
+
+    Datasets are stored one file per node output and read through
+    :mod:`mmap`, so only requested rows are loaded to memory. The entry is
+    keyed by the project uuid, the node id and the node execution fingerprint
+    (the end time and the size of dataset from :meth:`Project.get_execution_stats`),
+    therefore re-executed nodes are downloaded again. The least recently used
+    entries are evicted when the total size exceeds ``max_size``.
+
+    :param path: the cache directory, it's created if not exists
+    :param max_size: (optional) max size of the cache in bytes. Default: 1 GiB
+
+    Usage::
+
+      >>> cache = DatasetCache('~/.cache/polyanalyst6api')
+      >>> ds = prj.dataset('Python', cache=cache)
+      >>> rows = list(ds.iter_rows())  # downloads the dataset and stores it in the cache
+      >>> rows = list(ds.iter_rows())  # reads the dataset from the disk
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], max_size: int = 1 << 30) -> None:
+        self.path = pathlib.Path(path).expanduser()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'<DatasetCache [{self.path}]>'
+
+    def clear(self) -> None:
+        """Removes all cached datasets."""
+        for file in self.path.glob('*' + _SUFFIX):
+            with contextlib.suppress(OSError):
+                file.unlink()
+
+    def size(self) -> int:
+        """Returns the total size of cached datasets in bytes."""
+        return sum(size for _, size, _ in self._files())
+
+    @staticmethod
+    def _key(uuid: str, node_id: int, fingerprint: Tuple) -> str:
+        return hashlib.sha1(json.dumps([uuid, node_id, list(fingerprint)]).encode()).hexdigest()
+
+    def _get(self, key: str) -> Optional['_CacheEntry']:
+        file = self.path / (key + _SUFFIX)
+        try:
+            entry = _CacheEntry(file)
+        except (OSError, ValueError):
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(file)  # mark as recently used
+        return entry
+
+    def _writer(self, key: str, info: Dict[str, Any]) -> '_CacheWriter':
+        return _CacheWriter(self, self.path / (key + _SUFFIX), info)
+
+    def _files(self) -> List[Tuple[float, int, pathlib.Path]]:
+        files = []
+        for file in self.path.glob('*' + _SUFFIX):
+            with contextlib.suppress(OSError):
+                stat = file.stat()
+                files.append((stat.st_mtime, stat.st_size, file))
+        return files
+
+    def _evict(self, keep: pathlib.Path) -> None:
+        with self._lock:
+            files = sorted(self._files())
+            total = sum(size for _, size, _ in files)
+            for _, size, file in files:
+                if total <= self.max_size:
+                    break
+                if file == keep:
+                    continue
+                with contextlib.suppress(OSError):
+                    file.unlink()
+                    total -= size
+
+
+class _CacheEntry:
+    """Read-only view of the cached dataset.
+
+    The file consists of the fixed size head, the json-encoded dataset info,
+    marshalled rows and the index of the rows positions.
+    """
+
+    def __init__(self, file: pathlib.Path) -> None:
+        with open(file, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, marshal_version, header_len = _HEAD.unpack_from(self._mm)
+            if (magic, version, marshal_version) != (_MAGIC, _FORMAT_VERSION, marshal.version):
+                raise ValueError(f'Unsupported cache file format: {file}')
+            self.info: Dict[str, Any] = json.loads(self._mm[_HEAD.size:_HEAD.size + header_len])
+            index_pos, = _TAIL.unpack_from(self._mm, len(self._mm) - _TAIL.size)
+            self._view = memoryview(self._mm)
+            self._index = self._view[index_pos:len(self._mm) - _TAIL.size].cast('Q')
+        except (struct.error, ValueError, TypeError):
+            self._mm.close()
+            raise ValueError(f'Corrupted cache file: {file}')
+
+    def windows(self, start: int, stop: int, chunk_size: Optional[int]) -> Iterator[Tuple[int, List]]:
+        """Yields tuples of the first row index and the rows of consecutive windows."""
+        chunk_size = chunk_size or 10_000
+        try:
+            for offset in range(start, stop, chunk_size):
+                yield offset, [
+                    marshal.loads(self._mm[self._index[i]:self._index[i + 1]])
+                    for i in range(offset, min(offset + chunk_size, stop))
+                ]
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._mm.closed:
+            return
+        self._index.release()
+        self._view.release()
+        self._mm.close()
+
+
+class _CacheWriter:
+    """Writes dataset rows to the temporary file and moves it to the cache on commit."""
+
+    def __init__(self, cache: DatasetCache, file: pathlib.Path, info: Dict[str, Any]) -> None:
+        self._cache = cache
+        self._file = file
+        self._tmp = file.with_name(f'{file.name}.{_uuid.uuid4().hex}.tmp')
+        self._f = open(self._tmp, 'wb')
+        header = json.dumps(info).encode()
+        self._f.write(_HEAD.pack(_MAGIC, _FORMAT_VERSION, marshal.version, len(header)))
+        self._f.write(header)
+        self._pos = _HEAD.size + len(header)
+        self._offsets = array.array('Q')
+
+    def append(self, row: List) -> None:
+        data = marshal.dumps(row)
+        self._offsets.append(self._pos)
+        self._f.write(data)
+        self._pos += len(data)
+
+    def commit(self) -> None:
+        self._offsets.append(self._pos)
+        self._f.write(self._offsets.tobytes())
+        self._f.write(_TAIL.pack(self._pos))
+        self._f.close()
+        os.replace(self._tmp, self._file)
+        self._cache._evict(keep=self._file)
+
+    def discard(self) -> None:
+        if not self._f.closed:
+            self._f.close()
+            with contextlib.suppress(OSError):
+                self._tmp.unlink()
@@ -0,0 +1,366 @@
+"""
+polyanalyst6api.cluster
+~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the client balancing read-only requests between
+PolyAnalyst servers holding replicas of the same projects.
+"""
+import concurrent.futures
+import contextlib
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, TypeVar, Union
+
+import requests
+import urllib3
+
+from .api import API
+from .exceptions import APIException, ClientException, PAException
+from .project import Node, Project
+
+__all__ = ['Cluster', 'ClusterProject', 'ClusterDataSet', 'ServerState']
+
+T = TypeVar('T')
+NodeArg = Union[str, Dict[str, str]]
+
+_STRATEGIES = ('least-loaded', 'round-robin')
+# the statuses of proxies and overloaded servers, PolyAnalyst reports application errors with 500
+_FAILURE_STATUSES = (502, 503, 504)
+
+
+class ServerState(NamedTuple):
+    """The state of the cluster server.
+
+    ``latency`` is the duration of the last health check in seconds,
+    ``active`` is the number of operations routed to the server at the moment,
+    ``error`` is the reason the server is considered unhealthy.
+    """
+    url: str
+    healthy: bool
+    latency: Optional[float]
+    active: int
+    checked: Optional[float]
+    error: Optional[str]
+
+
+class _Member:
+    def __init__(self, api: API) -> None:
+        self.api = api
+        self.healthy = True
+        self.latency: Optional[float] = None
+        self.active = 0
+        self.checked: Optional[float] = None
+        self.error: Optional[str] = None
+        self.projects: Dict[str, Project] = {}
+
+
+class Cluster:
+    """Routes read-only work between logged in :class:`API` instances of servers
+    holding replicas of the same projects.
+
+    Dataset reads, previews, execution statistics and scheduler tasks are sent
+    to a healthy server chosen by `strategy`: ``'least-loaded'`` picks the
+    server with the least number of routed operations in progress (and the
+    fastest health check among equal ones), ``'round-robin'`` takes servers in
+    turn. Servers are checked by ``server/info`` requests every
+    `health_interval` seconds, the server not answering in `health_timeout`
+    seconds is unhealthy. The server is considered unhealthy until the next
+    successful check after connection errors, timeouts or 502, 503 and 504
+    responses, and the failed read is repeated on another server. Other
+    errors (e.g. PolyAnalyst application errors of 500 responses) are raised
+    as is. Interrupted :meth:`ClusterDataSet.iter_rows` continues from the
+    last delivered row.
+
+    Projects and nodes are looked up by uuid and name on every server.
+
+    :param apis: logged in instances, one per server
+    :param strategy: (optional) ``'least-loaded'`` (default) or ``'round-robin'``
+    :param health_interval: (optional) the number of seconds between health checks. Default: ``30``
+    :param node_list_ttl: (optional) the number of seconds node lists of projects are cached for. Default: ``60``
+    :param health_timeout: (optional) the timeout of health check requests in seconds. Default: ``5``
+
+    Usage::
+
+      >>> with Cluster.connect([URL1, URL2, URL3], USERNAME, PASSWORD) as cluster:
+      ...     ds = cluster.project(UUID).dataset('Python')
+      ...     rows = list(ds.iter_rows(chunk_size=50_000))
+      ...     print(cluster.status())
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(
+        self,
+        apis: Sequence[API],
+        strategy: str = 'least-loaded',
+        health_interval: float = 30,
+        node_list_ttl: Optional[float] = 60,
+        health_timeout: float = 5,
+    ) -> None:
+        if not apis:
+            raise ValueError('At least one API instance is required')
+        if strategy not in _STRATEGIES:
+            raise ValueError(f"strategy must be one of: {', '.join(_STRATEGIES)}")
+        self.strategy = strategy
+        self.health_interval = health_interval
+        self.node_list_ttl = node_list_ttl
+        self.health_timeout = health_timeout
+        self._members = [_Member(api) for api in apis]
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._checking = threading.Lock()
+
+    @classmethod
+    def connect(
+        cls,
+        urls: Sequence[str],
+        username: str,
+        password: str = '',
+        ldap_server: Optional[str] = None,
+        strategy: str = 'least-loaded',
+        health_interval: float = 30,
+        node_list_ttl: Optional[float] = 60,
+        health_timeout: float = 5,
+        **kwargs,
+    ) -> 'Cluster':
+        """Creates and logs in :class:`API` instances of `urls` concurrently.
+
+        :param kwargs: other :class:`API` parameters
+        """
+        apis = [API(url, username, password, ldap_server, **kwargs) for url in urls]
+        with concurrent.futures.ThreadPoolExecutor(len(apis)) as executor:
+            list(executor.map(API.login, apis))
+        return cls(apis, strategy, health_interval, node_list_ttl, health_timeout)
+
+    def __repr__(self):
+        return f'<Cluster [{len(self._members)} servers, {self.strategy}]>'
+
+    def __enter__(self) -> 'Cluster':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for member in self._members:
+            with contextlib.suppress(PAException):
+                member.api.__exit__(exc_type, exc_val, exc_tb)
+
+    @property
+    def apis(self) -> List[API]:
+        return [member.api for member in self._members]
+
+    def status(self) -> List[ServerState]:
+        """Returns the state of every server."""
+        with self._lock:
+            return [
+                ServerState(m.api.base_url, m.healthy, m.latency, m.active, m.checked, m.error)
+                for m in self._members
+            ]
+
+    def check_health(self) -> List[ServerState]:
+        """Checks all servers concurrently and returns their state."""
+        def check(member: _Member) -> None:
+            started = time.monotonic()
+            try:
+                # the check of the hung server must not block the read which triggered it
+                member.api.get('server/info', timeout=self.health_timeout)
+            except PAException as exc:
+                self._mark(member, str(exc))
+            else:
+                with self._lock:
+                    member.healthy, member.error = True, None
+                    member.latency = time.monotonic() - started
+            member.checked = time.monotonic()
+
+        with concurrent.futures.ThreadPoolExecutor(len(self._members)) as executor:
+            list(executor.map(check, self._members))
+        return self.status()
+
+    def project(self, uuid: str) -> 'ClusterProject':
+        """Returns :class:`ClusterProject` with given uuid."""
+        return ClusterProject(self, uuid)
+
+    def run_task(self, id: int) -> None:
+        """Initiates scheduler task execution on one of the servers.
+
+        The task is started on another server only if the request hasn't
+        reached the chosen one.
+
+        :param id: the task ID
+        """
+        self._call(lambda member: member.api.run_task(id), repeatable=_not_sent)
+
+    def _pick(self, exclude: Sequence[_Member] = ()) -> _Member:
+        now = time.monotonic()
+        if any(m.checked is None or now - m.checked >= self.health_interval for m in self._members):
+            # the concurrent callers use the current state instead of waiting for the check
+            if self._checking.acquire(blocking=False):
+                try:
+                    self.check_health()
+                finally:
+                    self._checking.release()
+
+        with self._lock:
+            candidates = [m for m in self._members if m.healthy and m not in exclude]
+            if not candidates:
+                # all servers have failed recently, try the ones which are not excluded anyway
+                candidates = [m for m in self._members if m not in exclude]
+            if not candidates:
+                raise ClientException('No healthy PolyAnalyst server left in the cluster')
+            if self.strategy == 'round-robin':
+                member = candidates[next(self._turn) % len(candidates)]
+            else:
+                member = min(candidates, key=lambda m: (m.active, m.latency or 0))
+            member.active += 1
+        return member
+
+    def _done(self, member: _Member) -> None:
+        with self._lock:
+            member.active -= 1
+
+    def _mark(self, member: _Member, error: str) -> None:
+        with self._lock:
+            member.healthy = False
+            member.error = error
+
+    def _call(
+        self,
+        func: Callable[[_Member], T],
+        repeatable: Optional[Callable[[PAException], bool]] = None,
+    ) -> T:
+        """Calls `func` with the picked server, repeating it on another server after server failures."""
+        repeatable = repeatable or _server_failure
+        tried: List[_Member] = []
+        while True:
+            member = self._pick(tried)
+            tried.append(member)
+            try:
+                return func(member)
+            except PAException as exc:
+                if not _server_failure(exc):
+                    raise
+                self._mark(member, str(exc))
+                if not repeatable(exc) or len(tried) == len(self._members):
+                    raise
+            finally:
+                self._done(member)
+
+    def _project(self, member: _Member, uuid: str) -> Project:
+        with self._lock:
+            prj = member.projects.get(uuid)
+            if prj is None:
+                prj = member.projects[uuid] = Project(member.api, uuid, self.node_list_ttl)
+        return prj
+
+
+class ClusterProject:
+    """The project replicated on the cluster servers, see :class:`Cluster`.
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, cluster: Cluster, uuid: str) -> None:
+        self.cluster = cluster
+        self.uuid = uuid
+
+    def __repr__(self):
+        return f'<ClusterProject [{self.uuid}]>'
+
+    def get_execution_stats(self) -> List[Node]:
+        """Returns nodes execution statistics from one of the servers."""
+        return self.cluster._call(lambda member: self._on(member).get_execution_stats())
+
+    def dataset(self, node: NodeArg) -> 'ClusterDataSet':
+        """Returns :class:`ClusterDataSet` of the node.
+
+        :param node: node name or dict with name and type of the node
+        """
+        if isinstance(node, dict):
+            node = {'name': node['name'], 'type': node['type']}  # ids may differ between servers
+        return ClusterDataSet(self, node)
+
+    def _on(self, member: _Member) -> Project:
+        return self.cluster._project(member, self.uuid)
+
+
+class ClusterDataSet:
+    """The dataset read from any of the cluster servers, see :class:`Cluster`.
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, prj: ClusterProject, node: NodeArg) -> None:
+        self._prj = prj
+        self._node = node
+
+    def __repr__(self):
+        name = self._node if isinstance(self._node, str) else self._node['name']
+        return f'<ClusterDataSet [{self._prj.uuid}, {name}]>'
+
+    def get_info(self) -> Dict[str, Any]:
+        """Get information about dataset."""
+        return self._prj.cluster._call(lambda member: self._on(member).get_info())
+
+    def preview(self) -> List[Dict[str, Any]]:
+        """Returns first 1000 rows with strings truncated to 250 characters."""
+        return self._prj.cluster._call(lambda member: self._on(member).preview())
+
+    def iter_rows(
+        self,
+        start: int = 0,
+        stop: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        text_workers: int = 4,
+        row_type: str = 'dict',
+        parallel: int = 1,
+    ) -> Iterator[Any]:
+        """
+        Iterate over rows in dataset, see :meth:`DataSet.iter_rows`.
+
+        If the server fails during the iteration, the rest rows are read from
+        another server starting from the last delivered row.
+        """
+        cluster = self._prj.cluster
+        delivered = start
+        tried: List[_Member] = []
+        while True:
+            # the server is considered busy until the iteration is over
+            member = cluster._pick(tried)
+            try:
+                for row in self._on(member).iter_rows(delivered, stop, chunk_size, text_workers, row_type, parallel):
+                    yield row
+                    delivered += 1
+                return
+            except PAException as exc:
+                if not _server_failure(exc):
+                    raise
+                cluster._mark(member, str(exc))
+                tried.append(member)
+                if len(tried) == len(cluster._members):
+                    raise
+            finally:
+                cluster._done(member)
+
+    def to_columns(self, *args, **kwargs) -> Dict[str, Any]:
+        """Returns dataset columns, see :meth:`DataSet.to_columns`."""
+        return self._prj.cluster._call(lambda member: self._on(member).to_columns(*args, **kwargs))
+
+    def _on(self, member: _Member):
+        return self._prj._on(member).dataset(self._node)
+
+
+def _server_failure(exc: PAException) -> bool:
+    """Checks whether the error is caused by the unavailable server rather than the request."""
+    if isinstance(exc, APIException):
+        return exc.status_code in _FAILURE_STATUSES
+    return isinstance(exc, ClientException) and isinstance(exc.__cause__, (requests.ConnectionError, requests.Timeout))
+
+
+def _not_sent(exc: PAException) -> bool:
+    """Checks whether the request has not reached the server."""
+    cause = exc.__cause__
+    if isinstance(cause, requests.ConnectTimeout):
+        return True
+    if not isinstance(cause, requests.ConnectionError) or not cause.args:
+        return False
+    # urllib3 error wrapped by requests
+    return isinstance(getattr(cause.args[0], 'reason', None), urllib3.exceptions.NewConnectionError)
@@ -4,8 +4,11 @@ polyanalyst6api.drive
 
 This module contains functionality for access to PolyAnalyst Drive API.
 """
+import contextlib
+import io
 import os
 import pathlib
+import time
 import warnings
 from urllib.parse import urljoin
 from typing import Optional, Union, IO
@@ -14,7 +17,8 @@ import pytus
 from pytus.main import _get_offset, _get_file_size
 import requests
 
-from .exceptions import APIException
+from .exceptions import APIException, ClientException
+from .metrics import RequestEvent
 
 
 __all__ = ['Drive']
@@ -98,13 +102,48 @@ class Drive:
         :param name: the filename
         :param path: a relative path of the file's parent directory
         """
+        content = io.BytesIO()
+        self.download(name, content, path)
+        return content.getvalue()
+
+    def download(
+        self,
+        name: str,
+        dest: Union[str, os.PathLike, IO],
+        path: str = '',
+        chunk_size: int = 1 << 20,
+    ) -> int:
+        """
+        Download the file to the local `dest` file chunk by chunk without
+        keeping the whole content in memory. Returns the number of written bytes.
+
+        :param name: the filename
+        :param dest: the local file path or the file-like object opened in binary mode
+        :param path: (optional) a relative path of the file's parent directory
+        :param chunk_size: (optional) the size of read chunks. Default: 1 MiB
+
+        Usage::
+          >>> drive.download('cars.csv', 'data/cars.csv', path='/data')
+
+        .. versionadded:: 0.21.0
+        """
         data = self.api.post('file/download', json={'path': path, 'name': name})
         resp, _ = self.api.request(
             urljoin(self.api.url, '/polyanalyst/download'),
             method='get',
-            params={'uid': data['uid']}
+            params={'uid': data['uid']},
+            decode=False,
+            stream=True,
         )
-        return resp.content
+        with resp, contextlib.ExitStack() as stack:
+            file = dest if hasattr(dest, 'write') else stack.enter_context(open(dest, mode='wb'))
+            size = 0
+            try:
+                for chunk in resp.iter_content(chunk_size):
+                    size += file.write(chunk)
+            except requests.RequestException as exc:
+                raise ClientException(exc)
+        return size
 
     def upload_file(self, file: IO, name: Optional[str] = None, path: str = '') -> None:
         """
@@ -143,7 +182,20 @@ class Drive:
             metadata={'foldername': path},
         )
 
-        pytus.resume(file, file_endpoint, session=self.api._s, offset=0)
+        # the tus requests are sent by pytus, so the whole upload takes one transfer slot
+        session = _PatchStatus(self.api._s)
+        waited = 0.0
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                if self.api.limiter is not None:
+                    waited = stack.enter_context(self.api.limiter.slot('PATCH', 'file/upload'))
+                    started = time.perf_counter()
+                pytus.resume(file, file_endpoint, session=session, offset=0)
+        finally:
+            if self.api.hooks:
+                seconds = time.perf_counter() - started
+                self.api._emit(RequestEvent('PATCH', 'file/upload', session.status, seconds, file_size, 0, 0, waited))
 
         # free up resources on the server if file is not uploaded completely
         try:
@@ -152,3 +204,21 @@ class Drive:
                 pytus.terminate(file_endpoint, session=self.api._s)
         except requests.exceptions.RequestException:
             pass
+
+
+class _PatchStatus:
+    """The proxy of the session which keeps the status of the last PATCH request,
+    i.e. of the final part of the tus upload. None if no response is received."""
+
+    def __init__(self, session: requests.Session) -> None:
+        self._session = session
+        self.status: Optional[int] = None
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def patch(self, *args, **kwargs) -> requests.Response:
+        self.status = None
+        response = self._session.patch(*args, **kwargs)
+        self.status = response.status_code
+        return response
@@ -5,7 +5,7 @@ polyanalyst6api.exceptions
 This module contains polyanlyst6api specific Exception classes.
 """
 
-__all__ = ['PAException', 'ClientException', 'APIException']
+__all__ = ['PAException', 'ClientException', 'APIException', 'WaitTimeout', 'CircuitOpen']
 
 
 class PAException(Exception):
@@ -33,5 +33,13 @@ class ClientException(PAException):
     """Indicate errors that don't involve interaction with PolyAnalyst's API."""
 
 
+class WaitTimeout(ClientException):
+    """Indicate that the awaited operation has not completed in time."""
+
+
+class CircuitOpen(ClientException):
+    """Indicate that requests are suspended by :class:`CircuitBreaker` after repeated server failures."""
+
+
 class _WrapperNotFound(PAException):
     pass
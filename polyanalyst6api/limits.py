@@ -0,0 +1,226 @@
+"""
+polyanalyst6api.limits
+~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the client-side rate and concurrency limits of :class:`API` requests.
+"""
+import contextlib
+import threading
+import time
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+__all__ = ['Limit', 'RequestLimiter', 'LimitStats', 'TokenBucket']
+
+_POLLING = frozenset({
+    'dataset/info',
+    'dataset/progress',
+    'project/execution-statistics',
+    'project/is-running',
+    'project/nodes',
+    'project/tasks',
+    'server/info',
+})
+_TRANSFER = frozenset({
+    'dataset/cell-text',
+    'dataset/preview',
+    'dataset/values',
+    'file/download',
+    'file/upload',
+    '/polyanalyst/download',
+})
+
+
+class Limit(NamedTuple):
+    """The limit of requests: max `rate` per second with bursts of `burst` requests
+    and max `concurrency` simultaneous requests. None means unlimited."""
+    rate: Optional[float] = None
+    burst: Optional[int] = None
+    concurrency: Optional[int] = None
+
+
+class LimitStats(NamedTuple):
+    """The number of requests of the class, the time they waited for the limits in seconds
+    and the number of requests in progress."""
+    requests: int
+    waited: float
+    in_flight: int
+
+
+class TokenBucket:
+    """Lets through `rate` operations per second on average and up to `burst` at once.
+
+    Callers reserve tokens in the order of arrival, so under contention the
+    throughput stays at `rate` and the wait is spread evenly.
+
+    :param rate: the number of tokens added per second
+    :param burst: (optional) the bucket capacity. Default: ``max(1, rate)``
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1, rate)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'<TokenBucket [{self.rate}/s, burst={self.capacity}]>'
+
+    def acquire(self) -> float:
+        """Takes the token waiting for it if needed. Returns the number of seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate) - 1
+            self._updated = now
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class _Gate:
+    """Rate and concurrency limit of the request class with wait statistics."""
+
+    def __init__(self, limit: Limit) -> None:
+        self.bucket = TokenBucket(limit.rate, limit.burst) if limit.rate else None
+        self.semaphore = threading.BoundedSemaphore(limit.concurrency) if limit.concurrency else None
+        self.requests = 0
+        self.waited = 0.0
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def acquire_token(self) -> float:
+        return self.bucket.acquire() if self.bucket is not None else 0.0
+
+    def acquire_slot(self) -> float:
+        if self.semaphore is None or self.semaphore.acquire(blocking=False):
+            return 0.0
+        started = time.monotonic()
+        self.semaphore.acquire()
+        return time.monotonic() - started
+
+    def release_slot(self) -> None:
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+    def record(self, waited: float, delta: int) -> None:
+        with self.lock:
+            if delta > 0:
+                self.requests += 1
+                self.waited += waited
+            self.in_flight += delta
+
+
+class RequestLimiter:
+    """Limits the rate and the number of simultaneous requests sent by :class:`API`.
+
+    Requests are divided to classes: ``'polling'`` (e.g. ``project/is-running``,
+    ``dataset/info``), ``'transfer'`` (``dataset/values``, ``dataset/cell-text``,
+    file downloads and uploads), ``'mutation'`` (the rest of not GET requests)
+    and ``'other'``. Every request passes both the global limit and the limit
+    of its class. Streamed responses (e.g. of :meth:`Drive.download`) hold the
+    concurrency slot until they are closed. The limiter may be shared by
+    several API instances to keep the common budget of the server.
+
+    :param rate: (optional) max number of requests per second
+    :param burst: (optional) max number of requests sent at once under the `rate`
+    :param concurrency: (optional) max number of simultaneous requests
+    :param classes: (optional) :class:`Limit` by request class
+
+    Usage::
+
+      >>> limiter = RequestLimiter(concurrency=16, classes={
+      ...     'polling': Limit(rate=10),
+      ...     'transfer': Limit(concurrency=4),
+      ... })
+      >>> api = API(URL, USERNAME, PASSWORD, limiter=limiter)
+      >>> ...
+      >>> print(limiter.stats()['transfer'].waited)
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        classes: Optional[Dict[str, Limit]] = None,
+    ) -> None:
+        self._global = _Gate(Limit(rate, burst, concurrency))
+        self._gates = {kind: _Gate(limit) for kind, limit in (classes or {}).items()}
+        self._unlimited = _Gate(Limit())
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'<RequestLimiter [{", ".join(self._gates)}]>'
+
+    @staticmethod
+    def classify(method: str, endpoint: str) -> str:
+        """Returns the class of the request. Override to change the classification."""
+        if endpoint in _POLLING:
+            return 'polling'
+        if endpoint in _TRANSFER or endpoint.startswith('file/upload/'):
+            return 'transfer'
+        if method.lower() != 'get':
+            return 'mutation'
+        return 'other'
+
+    def stats(self) -> Dict[str, LimitStats]:
+        """Returns the statistics of waits by request class and ``'total'``."""
+        with self._lock:
+            gates = dict(self._gates, total=self._global)
+        return {kind: LimitStats(gate.requests, gate.waited, gate.in_flight) for kind, gate in gates.items()}
+
+    @contextlib.contextmanager
+    def slot(self, method: str, endpoint: str) -> Iterator[float]:
+        """Waits for the limits of the request and holds its slot until the end of
+        the `with` block. Yields the number of seconds waited.
+
+        Used for requests which are not sent by :meth:`API.request`, e.g. tus
+        uploads of :meth:`Drive.upload_file`.
+
+        :param method: request method (e.g. GET, POST)
+        :param endpoint: PolyAnalyst API endpoint
+
+        Usage::
+
+          >>> with limiter.slot('PATCH', 'file/upload') as waited:
+          ...     upload()
+        """
+        kind, waited = self._acquire(method, endpoint)
+        try:
+            yield waited
+        finally:
+            self._release(kind)
+
+    def _acquire(self, method: str, endpoint: str) -> Tuple[str, float]:
+        """Waits for the limits. Returns the request class and the number of seconds waited."""
+        kind = self.classify(method, endpoint)
+        with self._lock:
+            gate = self._gates.get(kind)
+            if gate is None:
+                # the class is tracked even if it's not limited
+                gate = self._gates[kind] = _Gate(Limit())
+        waited = gate.acquire_token() + self._global.acquire_token()
+        # the class slot is taken first, so the request doesn't hold the global one while waiting
+        waited += gate.acquire_slot()
+        try:
+            waited += self._global.acquire_slot()
+        except BaseException:
+            gate.release_slot()
+            raise
+        gate.record(waited, 1)
+        self._global.record(waited, 1)
+        return kind, waited
+
+    def _release(self, kind: str) -> None:
+        gate = self._gates[kind]
+        self._global.release_slot()
+        gate.release_slot()
+        gate.record(0, -1)
+        self._global.record(0, -1)
@@ -0,0 +1,178 @@
+"""
+polyanalyst6api.metrics
+~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains request events passed to :class:`API` hooks and the
+collector of per-endpoint metrics.
+"""
+import bisect
+import json
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+__all__ = ['RequestEvent', 'RequestMetrics', 'EndpointStats']
+
+# the default buckets of prometheus client histograms
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class RequestEvent(NamedTuple):
+    """The completed request passed to :class:`API` hooks.
+
+    ``endpoint`` is the url path relative to the API url (e.g. ``dataset/values``,
+    parts of tus uploads have ``file/upload/{id}``),
+    ``status_code`` is None if the request failed without a response,
+    ``attempt`` is the number of the previous attempts of the same request,
+    ``waited`` is the number of seconds the request waited for :class:`RequestLimiter`.
+    """
+    method: str
+    endpoint: str
+    status_code: Optional[int]
+    seconds: float
+    bytes_sent: int
+    bytes_received: int
+    attempt: int = 0
+    waited: float = 0.0
+
+
+class EndpointStats(NamedTuple):
+    """Metrics of the single endpoint and method.
+
+    ``buckets`` are the counts of requests which took no longer than the
+    corresponding upper bound of ``bounds`` (not cumulative, the last bucket
+    counts requests slower than the last bound).
+    """
+    method: str
+    endpoint: str
+    calls: int
+    retries: int
+    seconds: float
+    bytes_sent: int
+    bytes_received: int
+    statuses: Dict[str, int]
+    bounds: Tuple[float, ...]
+    buckets: List[int]
+    waited: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+class RequestMetrics:
+    """Collects call counts, latency histograms, traffic and status codes per endpoint.
+
+    The instance is the :class:`API` hook, it's thread-safe and may be shared
+    by several API instances.
+
+    :param buckets: (optional) upper bounds of the latency histogram in seconds
+
+    Usage::
+
+      >>> metrics = RequestMetrics()
+      >>> api = API(URL, USERNAME, PASSWORD, hooks=[metrics])
+      >>> ...
+      >>> for stats in sorted(metrics.snapshot(), key=lambda s: s.seconds, reverse=True):
+      ...     print(stats.method, stats.endpoint, stats.calls, stats.seconds)
+      >>> print(metrics.to_prometheus())
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, buckets: Sequence[float] = _BUCKETS) -> None:
+        self.bounds = tuple(sorted(buckets))
+        self._stats: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: RequestEvent) -> None:
+        status = 'error' if event.status_code is None else str(event.status_code)
+        key = (event.method.upper(), event.endpoint)
+        bucket = bisect.bisect_left(self.bounds, event.seconds)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                # calls, retries, seconds, bytes sent and received, statuses, buckets, waited
+                stats = self._stats[key] = [0, 0, 0.0, 0, 0, {}, [0] * (len(self.bounds) + 1), 0.0]
+            stats[0] += 1
+            stats[1] += event.attempt > 0
+            stats[2] += event.seconds
+            stats[3] += event.bytes_sent
+            stats[4] += event.bytes_received
+            stats[5][status] = stats[5].get(status, 0) + 1
+            stats[6][bucket] += 1
+            stats[7] += event.waited
+
+    def snapshot(self) -> List[EndpointStats]:
+        """Returns the copy of the current metrics."""
+        with self._lock:
+            return [
+                EndpointStats(method, endpoint, *stats[:5], dict(stats[5]), self.bounds, list(stats[6]), stats[7])
+                for (method, endpoint), stats in sorted(self._stats.items())
+            ]
+
+    def reset(self) -> None:
+        """Clears collected metrics."""
+        with self._lock:
+            self._stats.clear()
+
+    def to_json(self) -> str:
+        """Returns the json-encoded list of endpoint metrics."""
+        return json.dumps([
+            {**stats._asdict(), 'bounds': list(stats.bounds)}
+            for stats in self.snapshot()
+        ])
+
+    def to_prometheus(self, prefix: str = 'polyanalyst6api') -> str:
+        """Returns metrics in the Prometheus text exposition format.
+
+        :param prefix: (optional) the prefix of metric names
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, help_: str) -> str:
+            name = f'{prefix}_{name}'
+            lines.append(f'# HELP {name} {help_}')
+            lines.append(f'# TYPE {name} {kind}')
+            return name
+
+        def labels(stats: EndpointStats, **extra: str) -> str:
+            pairs = {'method': stats.method, 'endpoint': stats.endpoint, **extra}
+            return ','.join(f'{k}="{_escape(v)}"' for k, v in pairs.items())
+
+        name = metric('requests_total', 'counter', 'The number of requests by status code.')
+        for stats in snapshot:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'{name}{{{labels(stats, status=status)}}} {count}')
+
+        name = metric('request_retries_total', 'counter', 'The number of retried requests.')
+        for stats in snapshot:
+            lines.append(f'{name}{{{labels(stats)}}} {stats.retries}')
+
+        name = metric('request_duration_seconds', 'histogram', 'The request latency.')
+        for stats in snapshot:
+            total = 0
+            for bound, count in zip(self.bounds + (float('inf'),), stats.buckets):
+                total += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{name}_bucket{{{labels(stats, le=le)}}} {total}')
+            lines.append(f'{name}_sum{{{labels(stats)}}} {stats.seconds}')
+            lines.append(f'{name}_count{{{labels(stats)}}} {stats.calls}')
+
+        name = metric('request_wait_seconds_total', 'counter', 'The time requests waited for client-side limits.')
+        for stats in snapshot:
+            lines.append(f'{name}{{{labels(stats)}}} {stats.waited}')
+
+        name = metric('request_sent_bytes_total', 'counter', 'The size of request bodies.')
+        for stats in snapshot:
+            lines.append(f'{name}{{{labels(stats)}}} {stats.bytes_sent}')
+
+        name = metric('request_received_bytes_total', 'counter', 'The size of response bodies.')
+        for stats in snapshot:
+            lines.append(f'{name}{{{labels(stats)}}} {stats.bytes_received}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
@@ -0,0 +1,180 @@
+"""
+polyanalyst6api.profiler
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the recorder and the report of nodes execution statistics.
+"""
+import json
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from .waiter import Waiter
+
+__all__ = ['ExecutionProfiler', 'NodeReport', 'Regression']
+
+# the time series point: seconds since the first sample, status, duration,
+# free memory and disk in megabytes at the end of execution, dataset rows
+_Point = Tuple[float, str, float, int, int, Optional[int]]
+
+
+class NodeReport(NamedTuple):
+    """Execution summary of the node.
+
+    Memory and disk deltas are the amounts of memory and disk space consumed
+    by the node execution in megabytes as reported by the server (negative if
+    freed). ``rows`` is None or -1 if the number of dataset rows is unknown.
+    """
+    id: int
+    name: str
+    type: str
+    status: str
+    duration: float
+    memory_delta: int
+    disk_delta: int
+    rows: Optional[int]
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        if self.rows is None or self.rows < 0 or not self.duration:
+            return None
+        return self.rows / self.duration
+
+
+class Regression(NamedTuple):
+    """The node which execution became slower than in the baseline run."""
+    name: str
+    type: str
+    baseline: float
+    duration: float
+
+    @property
+    def ratio(self) -> float:
+        return self.duration / self.baseline if self.baseline else float('inf')
+
+
+class ExecutionProfiler:
+    """Samples :meth:`Project.get_execution_stats` and keeps the time series of node statistics.
+
+    The point is stored only if the node statistics has changed since the
+    previous sample, so long recordings of idle nodes take no extra memory.
+
+    :param project: An instance of :class:`Project <Project>` class
+
+    Usage::
+
+      >>> profiler = ExecutionProfiler(prj)
+      >>> profiler.record(prj.execute('Python'), interval=2)
+      >>> for node in profiler.slowest(5):
+      ...     print(node.name, node.duration, node.memory_delta)
+      >>> regressions = profiler.compare('baseline.json', threshold=0.2)
+      >>> profiler.save('baseline.json')
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, project) -> None:
+        self.project = project
+        self.nodes: Dict[int, Dict[str, Union[int, str]]] = {}  # node id, name and type by node id
+        self.series: Dict[int, List[_Point]] = {}
+        self._last: Dict[int, Dict] = {}  # the latest statistics by node id
+        self._started: Optional[float] = None
+
+    def __repr__(self):
+        return f'<ExecutionProfiler [{self.project.uuid}, {len(self.series)} nodes]>'
+
+    def sample(self) -> None:
+        """Requests the execution statistics and appends changed node statistics to the series."""
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+
+        for node in self.project.get_execution_stats():
+            point = (
+                now - self._started,
+                node['status'],
+                node['duration'],
+                node['freeMemoryFinal'],
+                node['freeDiskFinal'],
+                node.get('datasetRows'),
+            )
+            series = self.series.setdefault(node['id'], [])
+            if not series or series[-1][1:] != point[1:]:
+                series.append(point)
+            self.nodes[node['id']] = {'id': node['id'], 'name': node['name'], 'type': node['type']}
+            self._last[node['id']] = node
+
+    def record(self, wave_id: int, interval: float = 1) -> float:
+        """
+        Samples statistics every `interval` seconds while the execution wave is
+        running and once after it completes. Returns the wave execution time.
+
+        :param wave_id: Execution wave identifier
+        :param interval: (optional) the delay between samples in seconds
+        """
+        def is_pending() -> bool:
+            self.sample()
+            return self.project.is_running(wave_id)
+
+        self.sample()
+        elapsed = Waiter(interval, factor=1, max_delay=interval, jitter=0).wait(is_pending)
+        self.sample()
+        return elapsed
+
+    def report(self) -> List[NodeReport]:
+        """Returns the summary of the latest statistics of every node."""
+        return [
+            NodeReport(
+                id=node['id'],
+                name=node['name'],
+                type=node['type'],
+                status=node['status'],
+                duration=node['duration'],
+                memory_delta=node['freeMemoryInitial'] - node['freeMemoryFinal'],
+                disk_delta=node['freeDiskInitial'] - node['freeDiskFinal'],
+                rows=node.get('datasetRows'),
+            )
+            for node in self._last.values()
+        ]
+
+    def slowest(self, n: int = 10) -> List[NodeReport]:
+        """Returns `n` nodes with the longest execution time."""
+        return sorted(self.report(), key=lambda node: node.duration, reverse=True)[:n]
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        """Saves the report to the json file to use it as the baseline.
+
+        :param path: the file path
+        """
+        with open(path, mode='w', encoding='utf-8') as f:
+            json.dump([node._asdict() for node in self.report()], f)
+
+    def compare(
+        self,
+        baseline: Union[str, os.PathLike, List[NodeReport]],
+        threshold: float = 0.1,
+        min_duration: float = 1,
+    ) -> List[Regression]:
+        """
+        Returns nodes which execution time exceeds the baseline one more than
+        by `threshold` fraction, the slowest regressions first. Nodes are
+        matched by name and type.
+
+        :param baseline: the file saved by :meth:`ExecutionProfiler.save` or the report
+        :param threshold: (optional) the allowed fraction of slowdown. Default: ``0.1``
+        :param min_duration: (optional) ignore nodes executed faster than this \
+            number of seconds in both runs. Default: ``1``
+        """
+        if not isinstance(baseline, list):
+            with open(baseline, encoding='utf-8') as f:
+                baseline = [NodeReport(**node) for node in json.load(f)]
+
+        durations = {(node.name, node.type): node.duration for node in baseline}
+        regressions = []
+        for node in self.report():
+            base = durations.get((node.name, node.type))
+            if base is None or max(base, node.duration) < min_duration:
+                continue
+            if node.duration > base * (1 + threshold):
+                regressions.append(Regression(node.name, node.type, base, node.duration))
+        return sorted(regressions, key=lambda r: r.ratio, reverse=True)
@@ -4,16 +4,40 @@ polyanalyst6api.project
 
 This module contains functionality for access to PolyAnalyst Analytical Client API.
 """
+import array
+import collections
+import concurrent.futures
+import contextlib
+import copy
+import csv
 import datetime
 import functools
+import hashlib
+import io
+import itertools
+import json
+import math
+import operator
+import os
+import pathlib
+import threading
 import time
 import warnings
 from urllib.parse import urlparse, parse_qs
-from typing import Any, Dict, List, Union, Optional, Tuple, Iterator
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Union, Optional, Tuple, Iterator, NamedTuple
 
-from .exceptions import APIException, _WrapperNotFound
+from .exceptions import APIException, ClientException, _WrapperNotFound
+from .waiter import Waiter
 
-__all__ = ['Project', 'Parameters', 'DataSet']
+if TYPE_CHECKING:
+    from .cache import DatasetCache, _CacheWriter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['Project', 'Parameters', 'ParametersSchema', 'DataSet', 'Column', 'ExportStats']
 
 # type hints
 Node = Dict[str, Union[str, int]]
@@ -21,21 +45,62 @@ Nodes = Dict[str, Dict[str, Union[int, str]]]
 _DataSet = List[Dict[str, Any]]
 JSON_VAL = Union[bool, str, int, float, None]
 
+# array.array typecodes of the dataset column types with fixed size values
+_TYPECODES = {'Integer': 'q', 'Numerical': 'd', 'Boolean': 'b'}
+_NUMPY_DTYPES = {'q': 'int64', 'd': 'float64', 'b': 'bool'}
+_ROW_TYPES = ('dict', 'tuple', 'namedtuple')
+_DEFAULT_CHUNK_SIZE = 10_000
+
+
+class Column(NamedTuple):
+    """Values of the dataset column.
+
+    ``values`` is the :class:`array.array` for integer, numerical and boolean
+    columns and the list for others. Null values are stored as zeros (or
+    ``None`` in lists) and marked by zero bytes in ``mask``.
+    """
+    name: str
+    type: str
+    values: Union[array.array, List[JSON_VAL]]
+    mask: bytearray
+
+
+class ExportStats(NamedTuple):
+    """Statistics of the dataset export to file."""
+    rows: int
+    bytes: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
 
 class Project:
     """This class maintains all operations with the PolyAnalyst's project and nodes.
 
     :param api: An instance of :class:`API <API>` class
     :param uuid: The uuid of the project you want to interact with
+    :param node_list_ttl: (optional) the number of seconds the node list is \
+        cached for. By default the node list is refreshed only after \
+        :meth:`Project.execute` or :meth:`Project.invalidate_node_list` calls.
     """
 
     def __repr__(self):
         return f'<Project [{self.uuid}]>'
 
-    def __init__(self, api, uuid: str) -> None:
+    def __init__(self, api, uuid: str, node_list_ttl: Optional[float] = None) -> None:
         self.api = api
         self.uuid = uuid
+        self.node_list_ttl = node_list_ttl
         self._node_list: List[Node] = []
+        self._node_list_updated: Optional[float] = None  # time.monotonic() of the last refresh
+        # indexes of _node_list rebuilt by _update_node_list
+        self._nodes_by_name: Dict[str, List[Node]] = {}
+        self._nodes_by_key: Dict[Tuple[str, str], Node] = {}
+        # dataset wrapper guids by node id shared by the project DataSet instances
+        self._wrapper_guids: Dict[int, str] = {}
+        self._wrapper_guids_lock = threading.Lock()
 
     def get_node_list(self) -> List[Node]:
         """Returns a list of project nodes.
@@ -45,12 +110,35 @@ class Project:
         return self.api.get(
             'project/nodes',
             params={'prjUUID': self.uuid},
-            headers={'sid': self.api.sid} if self.api.sid else None,
         )['nodes']
 
+    def get_node(self, node: Union[str, Dict[str, str]]) -> Node:
+        """Returns the node information (including its' status) from the cached node list.
+
+        The node list is requested if it's expired or invalidated, so the status
+        is only as fresh as the last refresh: it's not updated during the
+        execution unless `node_list_ttl` is set or :meth:`Project.invalidate_node_list`
+        is called before the lookup.
+
+        :param node: node name or dict with name and type of the node
+
+        .. versionadded:: 0.21.0
+        """
+        return self._find_node(node)
+
+    def invalidate_node_list(self) -> None:
+        """Marks the cached node list as expired, so it is requested on the next node lookup.
+
+        .. versionadded:: 0.21.0
+        """
+        self._node_list_updated = None
+
     def get_execution_stats(self) -> List[Node]:
         """Returns nodes execution statistics.
 
+        Use :class:`ExecutionProfiler <polyanalyst6api.profiler.ExecutionProfiler>`
+        to record statistics during the execution and compare runs.
+
         .. versionadded:: 0.15.0
         """
         return self.api.get('project/execution-statistics', params={'prjUUID': self.uuid})['nodes']
@@ -71,12 +159,15 @@ class Project:
         """Aborts the execution of all nodes in the project."""
         self.api.post('project/global-abort', json={'prjUUID': self.uuid})
 
-    def execute(self, *args: Union[str, Dict[str, str]], wait: bool = False) -> Optional[int]:
+    def execute(self, *args: Union[str, Dict[str, str]], wait: Union[bool, Waiter] = False) -> Optional[int]:
         """
         Initiates execution of nodes and returns execution wave identifier.
 
         :param args: node names and/or dicts with name and type of nodes
-        :param wait: wait for nodes execution to complete
+        :param wait: wait for nodes execution to complete. Pass :class:`Waiter <Waiter>` \
+            to customize polling intervals and the timeout.
+
+        :raises: WaitTimeout if the execution has not completed before the waiter timeout
 
         Usage::
 
@@ -96,6 +187,9 @@ class Project:
           ...     'Federated Search',
           ...     prj.get_node_list()[1],
           ... )
+
+        .. versionchanged:: 0.21.0
+            `wait` accepts :class:`Waiter <Waiter>`.
         """
         nodes = []
         for arg in args:
@@ -107,25 +201,58 @@ class Project:
             method='post',
             json={'prjUUID': self.uuid, 'nodes': nodes},
         )
+        self.invalidate_node_list()  # node statuses are changed by the execution
 
-        location = resp.headers.get('location')
-        query = urlparse(location).query
-        try:
-            wave_id = int(parse_qs(query).get('executionWave')[0])
-        except TypeError:
-            wave_id = None
+        wave_id = _parse_wave_id(resp.headers.get('location'))
 
         if wait:
+            waiter = wait if isinstance(wait, Waiter) else None
             if wave_id is None:
-                for node in nodes:
-                    self.wait_for_completion(node)  # type: ignore
+                self._wait_nodes(nodes, waiter)
                 return
 
-            while self.is_running(wave_id):
-                time.sleep(1)
+            self.wait(wave_id, waiter)
 
         return wave_id
 
+    def wait(self, wave_id: int, waiter: Optional[Waiter] = None) -> float:
+        """
+        Waits for the execution wave to complete and returns the number of
+        seconds passed until the poller has found it completed.
+
+        :param wave_id: Execution wave identifier
+        :param waiter: (optional) polling strategy. By default polls with \
+            delays growing from 0.1 to 5 seconds without timeout.
+
+        :raises: WaitTimeout if the execution has not completed before the waiter timeout. \
+            The project execution is aborted beforehand if ``waiter.abort_on_timeout`` is set.
+
+        .. versionadded:: 0.21.0
+        """
+        if waiter is None:
+            waiter = Waiter()
+        on_timeout = self.abort if waiter.abort_on_timeout else None
+        return waiter.wait(lambda: self.is_running(wave_id), on_timeout)
+
+    def watch(self, wave_id: int) -> concurrent.futures.Future:
+        """
+        Returns the future which is completed when the execution wave completes.
+
+        The wave is polled by the :attr:`API.watcher <API.watcher>` thread shared
+        by all projects, so many waves can be awaited without a thread per wave.
+        The result of the future is the number of seconds the wave was watched.
+
+        :param wave_id: Execution wave identifier
+
+        Usage::
+
+          >>> future = prj.watch(prj.execute('Python'))
+          >>> future.result(timeout=600)
+
+        .. versionadded:: 0.21.0
+        """
+        return self.api.watcher.watch(self.uuid, wave_id)
+
     def is_running(self, wave_id: int) -> bool:
         """
         Checks that execution wave is still running in the project.
@@ -141,14 +268,18 @@ class Project:
         )
         return bool(data['result'])
 
-    def dataset(self, node: Union[str, Dict[str, str]]):
+    def dataset(self, node: Union[str, Dict[str, str]], cache: Optional['DatasetCache'] = None):
         """Get dataset wrapper object.
 
         :param node: node name or dict with name and type of the node
+        :param cache: (optional) :class:`DatasetCache <DatasetCache>` to store \
+            and read the node dataset
 
         .. versionadded:: 0.16.0
+        .. versionchanged:: 0.21.0
+            Added `cache` parameter.
         """
-        return DataSet(self, self._find_node(node))
+        return DataSet(self, self._find_node(node), cache)
 
     def parameters(self, name: str):
         """Get parameters wrapper object.
@@ -181,19 +312,56 @@ class Project:
         self.api.post('project/delete', json={'prjUUID': self.uuid, 'forceUnload': force_unload})
 
     def _update_node_list(self) -> None:
-        self._node_list = self.get_node_list()
+        self._set_node_list(self.get_node_list())
+
+    def _set_node_list(self, nodes: List[Node]) -> None:
+        # the indexes are built aside, so concurrent lookups never see them half-filled
+        by_name: Dict[str, List[Node]] = {}
+        by_key: Dict[Tuple[str, str], Node] = {}
+        for node in nodes:
+            by_name.setdefault(node['name'], []).append(node)
+            by_key.setdefault((node['name'], node['type']), node)
+        self._node_list = nodes
+        self._nodes_by_name = by_name
+        self._nodes_by_key = by_key
+        self._node_list_updated = time.monotonic()
+
+    def _ensure_node_list(self) -> None:
+        """Refreshes the node list if it's invalidated or older than `node_list_ttl`."""
+        if self._node_list_expired():
+            self._update_node_list()
+
+    def _node_list_expired(self) -> bool:
+        return self._node_list_updated is None or (
+            self.node_list_ttl is not None
+            and time.monotonic() - self._node_list_updated >= self.node_list_ttl
+        )
 
     def _find_node(self, node_: Union[str, Dict[str, str]]) -> Node:
+        self._ensure_node_list()
+        return self._lookup_node(node_)
+
+    def _lookup_node(self, node_: Union[str, Dict[str, str]]) -> Node:
         if isinstance(node_, str):
             name_, type_ = node_, None
         else:
             name_, type_ = node_['name'], node_['type']
 
-        for node in self._node_list:
-            if node['name'] == name_ and (type_ is None or node['type'] == type_):
-                return node
+        if type_ is None:
+            nodes = self._nodes_by_name.get(name_, [])
+            if len(nodes) > 1:
+                types = ', '.join(f"'{node['type']}'" for node in nodes)
+                raise ClientException(
+                    f"There are several nodes named '{name_}' with types: {types}. "
+                    f"Pass the node as dict with name and type keys."
+                )
+            node = nodes[0] if nodes else None
+        else:
+            node = self._nodes_by_key.get((name_, type_))
 
-        raise APIException(f"Node not found: name='{name_}', type='{type_}'", status_code=500)
+        if node is None:
+            raise APIException(f"Node not found: name='{name_}', type='{type_}'", status_code=500)
+        return node
 
     def wait_for_completion(self, node: Union[str, Dict[str, str]]) -> bool:
         """Waits for the node to complete the execution. Returns True if node have
@@ -209,19 +377,35 @@ class Project:
             DeprecationWarning,
             stacklevel=2,
         )
-        time.sleep(0.5)  # give pa time to update node statuses
-        while True:
-            self._update_node_list()
-            stats = self._find_node(node)
+        return self._wait_nodes([node])[0]
+
+    def _wait_nodes(self, nodes: List[Union[str, Dict[str, str]]], waiter: Optional[Waiter] = None) -> List[bool]:
+        """Polls node statuses until the nodes complete the execution. Returns for
+        each node True if it has completed successfully and False otherwise.
 
-            if stats.get('errMsg'):
-                return False
-            if stats['status'] == 'synchronized':
-                return True
-            if stats['status'] == 'incomplete':
-                return False
+        :raises: WaitTimeout if the nodes have not completed before the waiter timeout
+        """
+        if waiter is None:
+            # give pa time to update node statuses
+            waiter = Waiter(initial_delay=0.5, factor=1.5, max_delay=5)
+        result = []
 
-            time.sleep(1)
+        def is_pending() -> bool:
+            self._update_node_list()
+            result.clear()
+            for node in nodes:
+                stats = self._find_node(node)
+                if stats.get('errMsg') or stats['status'] == 'incomplete':
+                    result.append(False)
+                elif stats['status'] == 'synchronized':
+                    result.append(True)
+                else:
+                    return True
+            return False
+
+        on_timeout = self.abort if waiter.abort_on_timeout else None
+        waiter.wait(is_pending, on_timeout)
+        return result
 
     def get_nodes(self) -> Nodes:
         """Returns a dictionary of project's nodes information.
@@ -237,7 +421,6 @@ class Project:
         json = self.api.get(
             'project/nodes',
             params={'prjUUID': self.uuid},
-            headers={'sid': self.api.sid} if self.api.sid else None,
         )
         return {node.pop('name'): node for node in json['nodes']}
 
@@ -308,6 +491,73 @@ class Project:
                 warnings.warn(msg)
 
 
+def _parse_wave_id(location: Optional[str]) -> Optional[int]:
+    """Returns the execution wave id from the location header of /project/execute response."""
+    query = urlparse(location).query
+    try:
+        return int(parse_qs(query).get('executionWave')[0])
+    except TypeError:
+        return None
+
+
+class ParametersSchema:
+    """Nodes with parameters and strategies supported by ``Parameters`` node
+    indexed by node type.
+
+    :param nodes: the list returned by ``parameters/nodes`` endpoint
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]]) -> None:
+        self.nodes = nodes
+        self._by_type = {node.get('type', node.get('name')): node for node in nodes}
+        self._params = {
+            node_type: {p['name'] if isinstance(p, dict) else p for p in node.get('parameters', ())}
+            for node_type, node in self._by_type.items()
+        }
+
+    def __repr__(self):
+        return f'<ParametersSchema [{len(self.nodes)} node types]>'
+
+    def __contains__(self, node_type: str) -> bool:
+        return node_type in self._by_type
+
+    def node_types(self) -> List[str]:
+        """Returns the supported node types."""
+        return list(self._by_type)
+
+    def node(self, node_type: str) -> Dict[str, Any]:
+        """Returns parameters and strategies of the node type.
+
+        :raises: ClientException if node type is not supported
+        """
+        try:
+            return self._by_type[node_type]
+        except KeyError:
+            raise ClientException(f"Node type '{node_type}' is not supported by Parameters node") from None
+
+    def validate(self, node_type: str, parameters: Union[Dict[str, Any], List[Dict[str, Any]]]) -> None:
+        """Checks that the node type and all parameter names are supported.
+
+        :raises: ClientException if node type or any of parameters is not supported
+        """
+        self.node(node_type)
+        known = self._params[node_type]
+        for params in parameters if isinstance(parameters, list) else [parameters]:
+            unknown = [name for name in params if name not in known]
+            if unknown:
+                raise ClientException(
+                    f"Unknown parameters of '{node_type}': {', '.join(unknown)}. "
+                    f"Supported parameters: {', '.join(sorted(known))}"
+                )
+
+
+# ParametersSchema by server url, build and version
+_schemas: Dict[Tuple[str, str, str], ParametersSchema] = {}
+_schemas_lock = threading.Lock()
+
+
 class Parameters:
     def __init__(self, api, uuid: Optional[str], id: Optional[str]):
         self.api = api
@@ -315,8 +565,50 @@ class Parameters:
         self.id = id
 
     def get(self):
-        """Returns list of nodes with parameters and strategies supported by ``Parameters`` node."""
-        return self.api.get('parameters/nodes')
+        """Returns list of nodes with parameters and strategies supported by ``Parameters`` node.
+
+        .. versionchanged:: 0.21.0
+            The list is cached, see :meth:`Parameters.schema`.
+        """
+        return copy.deepcopy(self.schema().nodes)
+
+    def schema(self) -> ParametersSchema:
+        """
+        Returns :class:`ParametersSchema` of the server.
+
+        The schema changes only with the server upgrade, so it's cached in memory
+        by the server url, build and version. If ``API.parameters_cache_dir`` is
+        set then it's also stored on the disk and shared between processes.
+
+        .. versionadded:: 0.21.0
+        """
+        info = self.api._get_server_info_cached()
+        key = (self.api.base_url, str(info.get('build')), str(info.get('version')))
+
+        with _schemas_lock:
+            schema = _schemas.get(key)
+        if schema is not None:
+            return schema
+
+        file = None
+        if self.api.parameters_cache_dir is not None:
+            digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+            file = pathlib.Path(self.api.parameters_cache_dir).expanduser() / f'parameters-{digest}.json'
+            with contextlib.suppress(OSError, ValueError):
+                schema = ParametersSchema(json.loads(file.read_text(encoding='utf-8')))
+
+        if schema is None:
+            nodes = self.api.get('parameters/nodes')
+            schema = ParametersSchema(nodes)
+            if file is not None:
+                with contextlib.suppress(OSError):
+                    file.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = file.with_name(f'{file.name}.{os.getpid()}.tmp')
+                    tmp.write_text(json.dumps(nodes), encoding='utf-8')
+                    os.replace(tmp, file)
+
+        with _schemas_lock:
+            return _schemas.setdefault(key, schema)
 
     def set(
             self,
@@ -325,6 +617,7 @@ class Parameters:
             strategies: Optional[List[int]] = None,
             declare_unsync: bool = True,
             hard_update: bool = True,
+            validate: bool = False,
     ) -> Optional[List[str]]:
         """
         Sets `node_type` parameters and strategies for the Parameters node.
@@ -339,10 +632,19 @@ class Parameters:
         :param hard_update: update every child node with new parameters if True, \
             otherwise reset their statuses. Works only if declare_unsync is True.\
             True by default.
+        :param validate: check `node_type` and parameter names against the cached \
+            :meth:`Parameters.schema` before sending them to the server. False by default.
+
+        :raises: ClientException if `validate` is True and node type or parameters are not supported
+
+        .. versionchanged:: 0.21.0
+            Added `validate` parameter.
         """
 
         if strategies is None:
             strategies = []
+        if validate:
+            self.schema().validate(node_type, parameters)
 
         method = 'configure-array' if isinstance(parameters, list) else 'configure'
 
@@ -379,22 +681,26 @@ class Parameters:
 def retry_on_invalid_guid(func):
     @functools.wraps(func)
     def wrapper(cls, *args, **kwargs):
+        if not cls.guid:
+            cls._update_guid('')
+        guid = cls.guid
         try:
             return func(cls, *args, **kwargs)
         except _WrapperNotFound:
-            cls._update_guid()
+            cls._update_guid(guid)
             return func(cls, *args, **kwargs)
     return wrapper
 
 
 class DataSet:
-    def __init__(self, prj: Project, node: Node):
+    def __init__(self, prj: Project, node: Node, cache: Optional['DatasetCache'] = None):
         self._prj = prj
         self._api = prj.api
         self._node = node
-        # on purpose send wrong wrapperGuid(empty string) at first request to /dataset/* endpoints
-        # to create dataset wrapper on server and retrieve its' guid by @retry_on_invalid_guid
-        self.guid: str = ''
+        self._cache = cache
+        # the dataset wrapper guid is resolved by @retry_on_invalid_guid before the first
+        # request to /dataset/* endpoints unless it's already known by the project
+        self.guid: str = prj._wrapper_guids.get(node['id'], '')
 
     @retry_on_invalid_guid
     def get_info(self) -> Dict[str, Any]:
@@ -413,14 +719,37 @@ class DataSet:
             params={'prjUUID': self._prj.uuid, 'name': self._node['name'], 'type': self._node['type']},
         )
 
-    def iter_rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, JSON_VAL]]:
+    def iter_rows(
+            self,
+            start: int = 0,
+            stop: Optional[int] = None,
+            chunk_size: Optional[int] = None,
+            text_workers: int = 4,
+            row_type: str = 'dict',
+            parallel: int = 1,
+    ) -> Iterator[Union[Dict[str, JSON_VAL], Tuple[JSON_VAL, ...]]]:
         """
         Iterate over rows in dataset.
 
-        :param start:
-        :param stop:
-
-        :raises: ValueError if `start` or `stop` is out of datasets' row range
+        :param start: the index of the first row
+        :param stop: the index of the row to stop at (not included)
+        :param chunk_size: (optional) the number of rows requested from the server \
+            at once. By default all rows up to `stop` are requested in one call.
+        :param text_workers: (optional) the number of threads requesting texts of \
+            `getTextAlways` columns ahead of iteration. Pass 0 to request texts \
+            one by one while iterating.
+        :param row_type: (optional) the type of rows: ``'dict'`` (default) with \
+            column titles as keys, ``'tuple'`` of values or ``'namedtuple'``. \
+            Tuples keep the column order, titles are available via the \
+            ``columns`` attribute of the returned iterator.
+        :param parallel: (optional) the number of windows downloaded concurrently. \
+            It's limited by ``API.max_parallel_downloads`` which is shared by all \
+            datasets of the API instance. Rows are still yielded in order. If \
+            `chunk_size` is not set windows of 10000 rows are used.
+
+        :raises: ValueError if `start` or `stop` is out of datasets' row range, \
+            `chunk_size` or `parallel` is not positive, `text_workers` is negative \
+            or `row_type` is unknown
 
         Usage::
 
@@ -431,52 +760,334 @@ class DataSet:
           # download full dataset and convert it to pandas.DataFrame
           >>> table = list(ds.iter_rows())
           >>> df = pandas.DataFrame(table)
+          # stream large dataset by 50000 rows keeping memory usage bounded
+          >>> for row in ds.iter_rows(chunk_size=50_000):
+          ...     process(row)
+          # tuples are cheaper than dicts for large exports
+          >>> rows = ds.iter_rows(row_type='tuple')
+          >>> writer.writerow(rows.columns)
+          >>> writer.writerows(rows)
+          # download 4 windows at once
+          >>> rows = list(ds.iter_rows(chunk_size=100_000, parallel=4))
+
+        .. versionchanged:: 0.21.0
+            Added `chunk_size`, `text_workers`, `row_type` and `parallel` parameters.
         """
-        info = self.get_info()
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
+        if text_workers < 0:
+            raise ValueError('text_workers must be a non-negative integer')
+        if row_type not in _ROW_TYPES:
+            raise ValueError(f"row_type must be one of: {', '.join(_ROW_TYPES)}")
+        if parallel < 1:
+            raise ValueError('parallel must be a positive integer')
+        if parallel > 1 and chunk_size is None:
+            chunk_size = _DEFAULT_CHUNK_SIZE
+
+        key = entry = None
+        if self._cache is not None:
+            fingerprint = self._fingerprint()
+            if fingerprint is not None:
+                key = self._cache._key(self._prj.uuid, self._node['id'], fingerprint)
+                entry = self._cache._get(key)
+
+        info = entry.info if entry else self.get_info()
         max_row = info['rowCount']
         if stop is None:
             stop = max_row
 
         # предпологается что если stop определен то пользователь в курсе количества строк в датасете
         if not 0 <= start <= stop <= max_row:
+            if entry:
+                entry.close()
             raise ValueError(f'start and stop arguments must be within dataset row range: (0, {max_row})')
 
-        rows = self._values(stop)['table']
-        get_text = self._cell_text
+        if entry:
+            return _RowIterator(info, entry.windows(start, stop, chunk_size), None, start, stop, 0, row_type)
 
-        class RowIterator:
-            def __init__(self):
-                self.idx = start
+        sink = None
+        if key is not None and start == 0 and stop == max_row:
+            sink = self._cache._writer(key, info)  # store the full dataset while iterating
+        windows = self._iter_windows(start, stop, chunk_size, parallel)
+        return _RowIterator(info, windows, self._cell_text, start, stop, text_workers, row_type, sink)
 
-            def __iter__(self):
-                return self
+    def to_columns(
+            self,
+            start: int = 0,
+            stop: Optional[int] = None,
+            chunk_size: Optional[int] = None,
+            text_workers: int = 4,
+            parallel: int = 1,
+    ) -> Dict[str, Column]:
+        """
+        Returns dataset columns as typed buffers without creating row objects.
+
+        Integer, numerical and boolean columns are stored in :class:`array.array`
+        of 64-bit integers, doubles and bytes respectively.
+
+        The parameters are the same as in :meth:`DataSet.iter_rows`.
+
+        Usage::
+
+          >>> columns = ds.to_columns(chunk_size=50_000)
+          >>> columns['Price'].values
+          array('d', [1.5, 0.0, 3.25])
+          >>> columns['Price'].mask
+          bytearray(b'\\x01\\x00\\x01')
+
+        .. versionadded:: 0.21.0
+        """
+        rows = self.iter_rows(start, stop, chunk_size, text_workers, parallel=parallel)
+
+        buffers = []
+        for column in rows._columns:
+            typecode = _TYPECODES.get(column['type'])
+            if column['flags'].get('getTextAlways') or typecode is None:
+                buffers.append((list.append, [], None))
+            else:
+                buffers.append((array.array.append, array.array(typecode), typecode))
+        masks = [bytearray() for _ in buffers]
+
+        for values in rows.values():
+            for value, (append, buffer, typecode), mask in zip(values, buffers, masks):
+                if value is None:
+                    mask.append(0)
+                    append(buffer, None if typecode is None else 0)
+                else:
+                    mask.append(1)
+                    append(buffer, value)
+
+        return {
+            column['title']: Column(column['title'], column['type'], buffer, mask)
+            for column, (_, buffer, _), mask in zip(rows._columns, buffers, masks)
+        }
+
+    def to_numpy(self, *args, **kwargs) -> Dict[str, Any]:
+        """
+        Returns dataset columns as numpy arrays.
+
+        Arrays of integer, numerical and boolean columns share memory with
+        the buffers of :meth:`DataSet.to_columns`, other columns are arrays
+        of objects. Columns with null values are returned as
+        :class:`numpy.ma.MaskedArray`.
+
+        Accepts the same parameters as :meth:`DataSet.to_columns`.
+
+        :raises: ClientException if numpy is not installed
 
-            def __next__(self):
-                if self.idx >= stop:
-                    raise StopIteration
+        .. versionadded:: 0.21.0
+        """
+        if numpy is None:
+            raise ClientException('numpy is required for DataSet.to_numpy(). Install it with `pip install numpy`')
+
+        result = {}
+        for name, column in self.to_columns(*args, **kwargs).items():
+            if isinstance(column.values, array.array):
+                values = numpy.frombuffer(column.values, dtype=_NUMPY_DTYPES[column.values.typecode])
+            else:
+                values = numpy.empty(len(column.values), dtype=object)
+                values[:] = column.values
+            mask = numpy.frombuffer(column.mask, dtype=numpy.bool_)
+            result[name] = values if mask.all() else numpy.ma.MaskedArray(values, mask=~mask)
+        return result
+
+    def to_csv(
+            self,
+            path: Union[str, os.PathLike],
+            start: int = 0,
+            stop: Optional[int] = None,
+            chunk_size: int = _DEFAULT_CHUNK_SIZE,
+            text_workers: int = 4,
+            parallel: int = 1,
+            progress: Optional[Callable[[ExportStats], None]] = None,
+            encoding: str = 'utf-8',
+            resume: bool = False,
+            **fmtparams,
+    ) -> ExportStats:
+        """
+        Writes dataset to the CSV file streaming it window by window.
 
-                result = {}
-                for column in info['columnsInfo']:
-                    if column['flags'].get('getTextAlways'):
-                        result[column['title']] = get_text(self.idx, column['id'], column['title'])
-                    # elif column['type'] == 'DateTime':  # todo convert to python datetime?
-                    else:
-                        result[column['title']] = rows[self.idx][column['id']]
+        The first line contains column titles, null values are written as
+        empty strings.
 
-                self.idx += 1
-                return result
+        :param path: the file path
+        :param progress: (optional) the function called with current \
+            :class:`ExportStats` after every `chunk_size` rows
+        :param encoding: (optional) the file encoding. Default: ``utf-8``
+        :param resume: (optional) continue the interrupted export: rows \
+            completely written to the existing file are kept and the rest \
+            rows are appended. Must be called with the same arguments. Default: ``False``
+        :param fmtparams: (optional) :func:`csv.writer` formatting parameters
 
-        return RowIterator()
+        The rest parameters are the same as in :meth:`DataSet.iter_rows`.
+        The returned :class:`ExportStats` counts the rows written by this call.
 
-    def _update_guid(self) -> None:
-        self.guid = self._api.get(
-            'dataset/wrapper-guid',
-            params={'prjUUID': self._prj.uuid, 'obj': self._node['id']},
-        )['wrapperGuid']
+        Usage::
+
+          >>> stats = ds.to_csv('export.csv', chunk_size=50_000)
+          >>> print(f'{stats.rows} rows, {stats.rows_per_second:.0f} rows/s')
+
+        .. versionadded:: 0.21.0
+        """
+        records, size = 0, 0
+        if resume:
+            records, size = _written_records(path, encoding, lambda lines: csv.reader(lines, **fmtparams))
+        skip = max(records - 1, 0)  # the first record is the header
+        rows = self.iter_rows(start + skip, stop, chunk_size, text_workers, row_type='tuple', parallel=parallel)
+
+        def write(file: io.TextIOWrapper) -> Iterator[int]:
+            writer = csv.writer(file, **fmtparams)
+            if not records:
+                writer.writerow(rows.columns)
+            for row in rows:
+                writer.writerow(row)
+                yield 1
+
+        return self._export(path, encoding, chunk_size, progress, write, size)
+
+    def to_jsonl(
+            self,
+            path: Union[str, os.PathLike],
+            start: int = 0,
+            stop: Optional[int] = None,
+            chunk_size: int = _DEFAULT_CHUNK_SIZE,
+            text_workers: int = 4,
+            parallel: int = 1,
+            progress: Optional[Callable[[ExportStats], None]] = None,
+            encoding: str = 'utf-8',
+            resume: bool = False,
+    ) -> ExportStats:
+        """
+        Writes dataset to the JSON Lines file streaming it window by window.
+
+        Every line is a json object with column titles as keys. NaN and
+        infinite values are written as ``null``.
+
+        The parameters are the same as in :meth:`DataSet.to_csv`.
+
+        .. versionadded:: 0.21.0
+        """
+        records, size = _written_records(path, encoding, iter) if resume else (0, 0)
+        rows = self.iter_rows(start + records, stop, chunk_size, text_workers, row_type='tuple', parallel=parallel)
+        # NaN and Infinity sent by the server are not valid json, they're written as null
+        encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False)
+        keys = [encoder.encode(title) + ':' for title in rows.columns]
+
+        def encode(value: JSON_VAL) -> str:
+            if isinstance(value, float) and not math.isfinite(value):
+                return 'null'
+            return encoder.encode(value)
+
+        def write(file: io.TextIOWrapper) -> Iterator[int]:
+            for row in rows:
+                file.write('{' + ','.join([key + encode(value) for key, value in zip(keys, row)]) + '}\n')
+                yield 1
+
+        return self._export(path, encoding, chunk_size, progress, write, size)
+
+    @staticmethod
+    def _export(
+            path: Union[str, os.PathLike],
+            encoding: str,
+            chunk_size: int,
+            progress: Optional[Callable[[ExportStats], None]],
+            write: Callable[[io.TextIOWrapper], Iterator[int]],
+            offset: int = 0,
+    ) -> ExportStats:
+        """Writes rows to the file starting from `offset` byte, the rest of the file is truncated."""
+        started = time.perf_counter()
+        count = 0
+        reported = None  # the number of rows in the last progress report
+        mode = 'r+b' if offset else 'wb'
+        with open(path, mode=mode) as binary, io.TextIOWrapper(binary, encoding, newline='') as file:
+            if offset:
+                binary.truncate(offset)
+                binary.seek(offset)
+            for count, _ in enumerate(write(file), 1):
+                if progress is not None and count % chunk_size == 0:
+                    file.flush()
+                    progress(ExportStats(count, binary.tell(), time.perf_counter() - started))
+                    reported = count
+            file.flush()
+            stats = ExportStats(count, binary.tell(), time.perf_counter() - started)
+        if progress is not None and count != reported:
+            progress(stats)
+        return stats
+
+    def _iter_windows(
+            self,
+            start: int,
+            stop: int,
+            chunk_size: Optional[int],
+            parallel: int = 1,
+    ) -> Iterator[Tuple[int, List]]:
+        """Yields tuples of the first row index and the rows of consecutive windows.
+
+        If `parallel` is greater than 1 then up to `parallel` next windows are
+        downloaded concurrently.
+        """
+        if chunk_size is None:
+            yield 0, self._values(stop)['table']
+            return
+
+        offsets = range(start, stop, chunk_size)
+        parallel = min(parallel, self._api.max_parallel_downloads, len(offsets))
+        if parallel <= 1:
+            for offset in offsets:
+                yield offset, self._values(min(chunk_size, stop - offset), offset)['table']
+            return
+
+        slots = self._api._download_slots
+
+        def download(offset: int) -> List:
+            with slots:
+                return self._values(min(chunk_size, stop - offset), offset)['table']
+
+        executor = concurrent.futures.ThreadPoolExecutor(parallel)
+        pending: collections.deque = collections.deque()
+        offsets_iter = iter(offsets)
+        try:
+            for offset in itertools.islice(offsets_iter, parallel):
+                pending.append((offset, executor.submit(download, offset)))
+            while pending:
+                offset, future = pending.popleft()
+                table = future.result()
+                for next_offset in itertools.islice(offsets_iter, 1):
+                    pending.append((next_offset, executor.submit(download, next_offset)))
+                yield offset, table
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _fingerprint(self) -> Optional[Tuple]:
+        """Returns the node execution state identifying its' dataset or None if node is not executed."""
+        for node in self._prj.get_execution_stats():
+            if node['id'] == self._node['id']:
+                if node['status'] != 'synchronized' or node.get('errMsg'):
+                    return None
+                return node['endTime'], node.get('datasetRows'), node.get('datasetCols')
+        return None
+
+    def _update_guid(self, expired: str) -> None:
+        """Takes the guid from the project cache or requests the new one if cached guid is
+        missing or is the `expired` one (i.e. its' wrapper is not found)."""
+        guids = self._prj._wrapper_guids
+        with self._prj._wrapper_guids_lock:
+            guid = guids.get(self._node['id'])
+            if not guid or guid == expired:
+                guid = guids[self._node['id']] = self._api.get(
+                    'dataset/wrapper-guid',
+                    params={'prjUUID': self._prj.uuid, 'obj': self._node['id']},
+                )['wrapperGuid']
+            self.guid = guid
 
     @retry_on_invalid_guid
-    def _values(self, row_count: int) -> Dict[str, Union[List, Dict]]:
-        return self._api.get('dataset/values', json={'wrapperGuid': self.guid, 'rowCount': row_count})
+    def _values(self, row_count: int, offset: int = 0) -> Dict[str, Union[List, Dict]]:
+        json = {'wrapperGuid': self.guid, 'rowCount': row_count}
+        if offset:
+            json['offset'] = offset
+        return self._api.get('dataset/values', json=json)
 
     @retry_on_invalid_guid
     def _cell_text(self, row: int, col: int, _title) -> str:
@@ -492,3 +1103,188 @@ class DataSet:
                 'count': 0,
             },
         )['text']
+
+
+def _written_records(
+        path: Union[str, os.PathLike],
+        encoding: str,
+        parse: Callable[[Iterator[str]], Iterator[Any]],
+) -> Tuple[int, int]:
+    """Returns the number of records completely written to the exported file and their size in bytes.
+
+    The record is complete if it's followed by the line break. `parse` splits
+    lines to records, e.g. :func:`csv.reader` joins lines of quoted multiline values.
+    """
+    records = size = pos = 0
+    last = ''
+
+    def lines() -> Iterator[str]:
+        nonlocal pos, last
+        for line in file:
+            pos += len(line.encode(encoding))
+            last = line
+            yield line
+
+    try:
+        with open(path, encoding=encoding, newline='') as file:
+            for _ in parse(lines()):
+                if not last.endswith('\n'):
+                    break
+                records += 1
+                size = pos
+    except FileNotFoundError:
+        pass
+    except (UnicodeDecodeError, csv.Error):
+        pass  # the broken tail is overwritten
+    return records, size
+
+
+class _RowIterator:
+    """Iterates over dataset rows fetching them window by window.
+
+    Only the current window is kept in memory, it's released as soon as its'
+    last row has been consumed. Texts of `getTextAlways` columns are requested
+    by the pool of `text_workers` threads up to `prefetch` rows ahead.
+
+    The column plan (value getter and positions of text columns) is compiled
+    once, so rows are built without looking into `columnsInfo` again.
+
+    If `get_text` is None then `windows` rows already contain texts. Rows with
+    resolved texts are passed to `sink` which is committed after the last row.
+    """
+
+    prefetch = 256
+
+    def __init__(
+            self,
+            info: Dict[str, Any],
+            windows: Iterator[Tuple[int, List]],
+            get_text: Optional[Callable[[int, int, str], str]],
+            start: int,
+            stop: int,
+            text_workers: int,
+            row_type: str = 'dict',
+            sink: Optional['_CacheWriter'] = None,
+    ):
+        # the state released by _close is set first, so __del__ works if __init__ fails
+        self.idx = start
+        self._stop = stop
+        self._windows = windows
+        self._sink = sink
+        self._table: List = []
+        self._executor = None
+        self._texts: collections.deque = collections.deque()  # futures of the rows texts starting from idx
+
+        self._columns = info['columnsInfo']
+        self.columns: List[str] = [column['title'] for column in self._columns]
+        self._get_text = get_text
+        self._offset = start
+
+        # compiled column plan
+        ids = [column['id'] for column in self._columns]
+        if len(ids) == 1:
+            self._getter = lambda row, _id=ids[0]: (row[_id],)
+        elif ids:
+            self._getter = operator.itemgetter(*ids)
+        else:
+            self._getter = lambda row: ()
+        self._text_columns = [
+            (pos, column['id'], column['title'])
+            for pos, column in enumerate(self._columns)
+            if get_text is not None and column['flags'].get('getTextAlways')
+        ]
+
+        if row_type == 'dict':
+            titles = self.columns
+            self._make_row = lambda values: dict(zip(titles, values))
+        elif row_type == 'tuple':
+            self._make_row = tuple
+        else:
+            self.row_class = collections.namedtuple('Row', self.columns, rename=True)
+            self._make_row = self.row_class._make
+
+        if self._text_columns and text_workers:
+            self._executor = concurrent.futures.ThreadPoolExecutor(text_workers)
+        self._requested = start  # the index of the next row which texts are not requested yet
+
+    def __del__(self):
+        self._close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._make_row(self._next_values())
+
+    def values(self) -> Iterator[List[JSON_VAL]]:
+        """Yields lists of row values in the order of `columnsInfo`."""
+        while True:
+            try:
+                yield self._next_values()
+            except StopIteration:
+                return
+
+    def _next_values(self) -> List[JSON_VAL]:
+        if self.idx >= self._stop:
+            self._close()
+            raise StopIteration
+
+        while self.idx - self._offset >= len(self._table):
+            self._table = []  # drop consumed window before requesting the next one
+            try:
+                self._offset, self._table = next(self._windows)
+            except BaseException:
+                self._close()
+                raise
+
+        row = self._table[self.idx - self._offset]
+        # todo convert DateTime columns to python datetime?
+        result = list(self._getter(row))
+        if self._text_columns:
+            texts = self._row_texts()
+            for (pos, _, _), text in zip(self._text_columns, texts):
+                result[pos] = text
+            if self._sink is not None:
+                row = list(row)
+                for (_, col, _), text in zip(self._text_columns, texts):
+                    row[col] = text
+        if self._sink is not None:
+            self._sink.append(row)
+
+        self.idx += 1
+        return result
+
+    def _row_texts(self) -> List[str]:
+        if self._executor is None:
+            return [self._get_text(self.idx, col, title) for _, col, title in self._text_columns]
+
+        last = min(self.idx + self.prefetch, self._stop)
+        while self._requested < last:
+            self._texts.append([
+                self._executor.submit(self._get_text, self._requested, col, title)
+                for _, col, title in self._text_columns
+            ])
+            self._requested += 1
+
+        try:
+            return [future.result() for future in self._texts.popleft()]
+        except BaseException:
+            self._close()
+            raise
+
+    def _close(self) -> None:
+        self._table = []
+        self._windows.close()
+        if self._sink is not None:
+            if self.idx >= self._stop:
+                self._sink.commit()
+            else:
+                self._sink.discard()
+            self._sink = None
+        if self._executor is not None:
+            for futures in self._texts:
+                for future in futures:
+                    future.cancel()
+            self._texts.clear()
+            self._executor.shutdown(wait=False)
+            self._executor = None
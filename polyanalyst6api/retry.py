@@ -0,0 +1,140 @@
+"""
+polyanalyst6api.retry
+~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the retry policy and the circuit breaker of :class:`API` requests.
+"""
+import threading
+import time
+from typing import Iterable, Optional
+
+import requests
+
+from .exceptions import APIException, CircuitOpen, ClientException, PAException
+from .waiter import Waiter
+
+__all__ = ['RetryPolicy', 'CircuitBreaker']
+
+# the errors of connections which may succeed if repeated
+_TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class RetryPolicy:
+    """Describes which :class:`API` requests are repeated after transient failures.
+
+    Idempotent requests failed because of the connection error, the timeout or
+    one of `statuses` are repeated up to `retries` times with the delays of
+    `backoff`. Any request rejected because the session has expired is
+    repeated once after the new login.
+
+    :param retries: (optional) max number of repeats of the request. Default: ``3``
+    :param backoff: (optional) the delays between repeats. Default: ``Waiter(0.5, 2, 30)``
+    :param statuses: (optional) http status codes of transient server errors. \
+        Default: ``502, 503, 504``
+    :param idempotent_endpoints: (optional) the endpoints which are repeated \
+        regardless of the request method. GET requests are always idempotent.
+    :param relogin: (optional) login and repeat the request when the session \
+        has expired. Default: ``True``
+
+    Usage::
+
+      >>> api = API(URL, USERNAME, PASSWORD, retry=RetryPolicy(retries=5), circuit_breaker=CircuitBreaker())
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(
+        self,
+        retries: int = 3,
+        backoff: Optional[Waiter] = None,
+        statuses: Iterable[int] = (502, 503, 504),
+        idempotent_endpoints: Iterable[str] = (),
+        relogin: bool = True,
+    ) -> None:
+        if retries < 0:
+            raise ValueError('retries must be a non-negative integer')
+        self.retries = retries
+        self.backoff = backoff if backoff is not None else Waiter(0.5, 2, 30)
+        self.statuses = frozenset(statuses)
+        self.idempotent_endpoints = frozenset(idempotent_endpoints)
+        self.relogin = relogin
+
+    def __repr__(self):
+        return f'<RetryPolicy [retries={self.retries}, statuses={sorted(self.statuses)}]>'
+
+    def is_idempotent(self, method: str, endpoint: str) -> bool:
+        """Checks whether the request may be safely repeated."""
+        # logout is the only GET request changing the state of the server
+        return (method.lower() == 'get' and endpoint != 'logout') or endpoint in self.idempotent_endpoints
+
+
+class CircuitBreaker:
+    """Stops sending requests to the server which keeps failing.
+
+    After `failure_threshold` consecutive transient failures (see
+    :class:`RetryPolicy`) the circuit opens and requests raise
+    :class:`CircuitOpen` without reaching the server. In `reset_timeout`
+    seconds the single trial request is let through: the circuit closes if it
+    succeeds and opens again otherwise.
+
+    :param failure_threshold: (optional) the number of consecutive failures. Default: ``5``
+    :param reset_timeout: (optional) the number of seconds the circuit is open for. Default: ``30``
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'<CircuitBreaker [{self.state}, {self._failures} failures]>'
+
+    @property
+    def state(self) -> str:
+        """``'closed'``, ``'open'`` or ``'half-open'``"""
+        with self._lock:
+            if self._opened is None:
+                return 'closed'
+            if self._trial or time.monotonic() - self._opened >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def _before(self) -> None:
+        with self._lock:
+            if self._opened is None:
+                return
+            left = self._opened + self.reset_timeout - time.monotonic()
+            if left > 0 or self._trial:
+                raise CircuitOpen(f'The server keeps failing, requests are suspended for {max(left, 0):.1f} seconds')
+            self._trial = True
+
+    def _record(self, ok: Optional[bool]) -> None:
+        """Records the result of the request, None if it's unknown (e.g. interrupted)."""
+        with self._lock:
+            trial, self._trial = self._trial, False
+            if ok is None:
+                return
+            if ok:
+                self._failures = 0
+                self._opened = None
+                return
+            self._failures += 1
+            if trial or self._failures >= self.failure_threshold:
+                self._opened = time.monotonic()
+
+
+def _is_transient(exc: PAException, statuses: Iterable[int]) -> bool:
+    if isinstance(exc, APIException):
+        return exc.status_code in statuses
+    return isinstance(exc, ClientException) and isinstance(exc.__cause__, _TRANSIENT_ERRORS)
+
+
+def _session_expired(exc: PAException) -> bool:
+    return isinstance(exc, APIException) and (
+        exc.status_code == 401 or (exc.status_code == 403 and 'not logged in' in exc.message)
+    )
@@ -0,0 +1,227 @@
+"""
+polyanalyst6api.session
+~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the manager of persisted sessions and the pool of
+logged in :class:`API` instances.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+import uuid as _uuid
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .api import API
+from .exceptions import APIException
+
+__all__ = ['SessionManager', 'FileTokenStore']
+
+
+class FileTokenStore:
+    """Stores session tokens in the directory, one json file per key.
+
+    Files are readable by the owner only and replaced atomically, so the
+    store may be shared by concurrent processes. Any object with the same
+    ``get``, ``set`` and ``delete`` methods (e.g. a wrapper of a key-value
+    database) may be used as the :class:`SessionManager` store instead.
+
+    :param path: the directory of token files, it's created if not exists
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        self.path = pathlib.Path(path).expanduser()
+        self.path.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    def __repr__(self):
+        return f'<FileTokenStore [{self.path}]>'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, token: Dict[str, Any]) -> None:
+        file = self._file(key)
+        tmp = file.with_name(f'{file.name}.{_uuid.uuid4().hex}.tmp')
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(token, f)
+            os.replace(tmp, file)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                tmp.unlink()
+            raise
+
+    def delete(self, key: str) -> None:
+        with contextlib.suppress(OSError):
+            self._file(key).unlink()
+
+    def _file(self, key: str) -> pathlib.Path:
+        return self.path / (hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+
+class SessionManager:
+    """Hands out logged in :class:`API` instances reusing the persisted session.
+
+    The session token is stored in `store` keyed by the server, the user and
+    the LDAP server, so other processes (e.g. next runs of the script) reuse
+    it instead of logging in. The token is validated by the cheap
+    :meth:`API.get_server_info` request unless it was validated in the last
+    ``revalidate_after`` seconds, and the new login is performed only if the
+    server rejects it.
+
+    Released instances are kept in the pool of ``pool_size`` instances and
+    handed out again with their open connections.
+
+    :param url: The scheme, host and port of a PolyAnalyst server
+    :param username: The username to login with
+    :param password: (optional) The password for specified username
+    :param ldap_server: (optional) LDAP Server address
+    :param store: (optional) the token store. By default tokens are kept in memory only
+    :param pool_size: (optional) max number of idle instances. Default: ``4``
+    :param revalidate_after: (optional) the number of seconds the validated \
+        token is reused without validation. Default: ``60``
+    :param kwargs: other :class:`API` parameters
+
+    Usage::
+
+      >>> sessions = SessionManager(URL, USERNAME, PASSWORD, store=FileTokenStore('~/.polyanalyst6api'))
+      >>> with sessions.lease() as api:
+      ...     api.project(UUID).execute('Export', wait=True)
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str = '',
+        ldap_server: Optional[str] = None,
+        store: Optional[Any] = None,
+        pool_size: int = 4,
+        revalidate_after: float = 60,
+        **kwargs,
+    ) -> None:
+        self.url = url
+        self.username = username
+        self.password = password
+        self.ldap_server = ldap_server
+        self.store = store if store is not None else _MemoryTokenStore()
+        self.pool_size = pool_size
+        self.revalidate_after = revalidate_after
+        self._kwargs = kwargs
+        self.key = f'{url}|{username}|{ldap_server or ""}'
+        self._idle: List[API] = []
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+
+    def __repr__(self):
+        return f'<SessionManager [{self.username}@{self.url}, {len(self._idle)} idle]>'
+
+    def __enter__(self) -> 'SessionManager':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def acquire(self) -> API:
+        """Returns the logged in instance from the pool or creates the new one."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        api = API(self.url, self.username, self.password, self.ldap_server, **self._kwargs)
+        self._authorize(api)
+        return api
+
+    def release(self, api: API) -> None:
+        """Returns the instance to the pool. The session stays open for other users of the token."""
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(api)
+                return
+        api._s.close()
+
+    @contextlib.contextmanager
+    def lease(self) -> Iterator[API]:
+        """Context manager acquiring and releasing the instance."""
+        api = self.acquire()
+        try:
+            yield api
+        finally:
+            self.release(api)
+
+    def invalidate(self) -> None:
+        """Forgets the stored token, e.g. after the session has been expired."""
+        self.store.delete(self.key)
+
+    def close(self, logout: bool = False) -> None:
+        """Closes idle instances.
+
+        :param logout: (optional) also log out and delete the token, \
+            so no one can reuse the session. Default: ``False``
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        if logout:
+            if not idle:
+                idle.append(self.acquire())
+            api = idle[0]
+            with contextlib.suppress(APIException):
+                api.logout()
+            self.invalidate()
+        for api in idle:
+            api._s.close()
+
+    def _authorize(self, api: API) -> None:
+        token = self.store.get(self.key)
+        if token is not None and self._restore(api, token):
+            return
+
+        # only one thread logs in, the others reuse its token
+        with self._login_lock:
+            fresh = self.store.get(self.key)
+            if fresh is not None and fresh != token and self._restore(api, fresh):
+                return
+            api.login()
+            self.store.set(self.key, {**api.session_token(), 'validated': time.time()})
+
+    def _restore(self, api: API, token: Dict[str, Any]) -> bool:
+        api.restore_session(token)
+        if time.time() - token.get('validated', 0) < self.revalidate_after:
+            return True
+        try:
+            api._server_info = api.get_server_info() or {}
+        except APIException as exc:
+            if exc.status_code not in (401, 403):
+                raise
+            api.sid = None
+            api._s.cookies.clear()
+            api._s.headers.pop('Authorization', None)
+            return False
+        self.store.set(self.key, {**token, 'validated': time.time()})
+        return True
+
+
+class _MemoryTokenStore:
+    def __init__(self) -> None:
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._tokens.get(key)
+
+    def set(self, key: str, token: Dict[str, Any]) -> None:
+        self._tokens[key] = token
+
+    def delete(self, key: str) -> None:
+        self._tokens.pop(key, None)
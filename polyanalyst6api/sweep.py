@@ -0,0 +1,142 @@
+"""
+polyanalyst6api.sweep
+~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the runner of parameter sweeps over the project copies.
+"""
+import itertools
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+from .waiter import Waiter
+
+__all__ = ['SweepResult', 'grid', 'sweep']
+
+NodeArg = Union[str, Dict[str, str]]
+Settings = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+_FETCHERS: Dict[str, Callable] = {
+    'preview': lambda ds: ds.preview(),
+    'rows': lambda ds: list(ds.iter_rows()),
+}
+
+
+class SweepResult(NamedTuple):
+    """The outputs of the single parameter set run by :func:`sweep`.
+
+    ``outputs`` maps the collected node names to the fetched data, ``warnings``
+    are returned by :meth:`Parameters.set`, ``error`` is the exception which
+    stopped the run.
+    """
+    index: int
+    parameters: Settings
+    project: str
+    outputs: Dict[str, Any]
+    warnings: Optional[List[str]] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def grid(**values: Sequence[Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yields parameter sets of all combinations of the given values.
+
+    Usage::
+
+      >>> list(grid(Depth=[1, 2], Criterion=['gini', 'entropy']))
+      [{'Depth': 1, 'Criterion': 'gini'}, {'Depth': 1, 'Criterion': 'entropy'}, ...]
+
+    .. versionadded:: 0.21.0
+    """
+    names = list(values)
+    for combination in itertools.product(*values.values()):
+        yield dict(zip(names, combination))
+
+
+def sweep(
+    projects: Sequence[Any],
+    parameters_node: str,
+    node_type: str,
+    settings: Iterable[Settings],
+    execute: Sequence[NodeArg],
+    collect: Sequence[NodeArg],
+    fetch: Union[str, Callable[[Any], Any]] = 'preview',
+    strategies: Optional[List[int]] = None,
+    waiter: Optional[Waiter] = None,
+) -> List[SweepResult]:
+    """
+    Runs set parameters -> execute -> wait -> fetch outputs for every parameter set.
+
+    Parameter sets are distributed between `projects`, which should be copies
+    of the same project, each one processing the next pending set as soon
+    as it's done with the previous one. So while outputs of one run are
+    downloaded the other copies keep executing. The runs of the same copy are
+    sequential because changing parameters resets the outputs.
+
+    :param projects: :class:`Project <Project>` instances to run sets on
+    :param parameters_node: the name of Parameters node
+    :param node_type: the node type which parameters are set
+    :param settings: parameter sets passed to :meth:`Parameters.set`
+    :param execute: the nodes to execute
+    :param collect: the nodes which outputs are fetched
+    :param fetch: (optional) ``'preview'`` (default), ``'rows'`` to download \
+        all rows or the function called with :class:`DataSet <DataSet>`
+    :param strategies: (optional) node type strategies
+    :param waiter: (optional) polling strategy of the execution
+
+    :returns: the list of :class:`SweepResult` in the order of `settings`
+
+    Usage::
+
+      >>> results = sweep(
+      ...     [api.project(uuid) for uuid in copies],
+      ...     'Parameters', 'Dataset/Python',
+      ...     [{'Script': script.format(depth=depth)} for depth in range(1, 10)],
+      ...     execute=['Model'], collect=['Scores'],
+      ... )
+
+    .. versionadded:: 0.21.0
+    """
+    if not projects:
+        raise ValueError('At least one project is required')
+    fetch_data = _FETCHERS[fetch] if isinstance(fetch, str) else fetch
+
+    pending: queue.Queue = queue.Queue()
+    for item in enumerate(settings):
+        pending.put(item)
+    results: List[SweepResult] = []
+    lock = threading.Lock()
+
+    def worker(prj) -> None:
+        while True:
+            try:
+                index, parameters = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            outputs: Dict[str, Any] = {}
+            warns = error = None
+            try:
+                warns = prj.parameters(parameters_node).set(node_type, parameters, strategies)
+                wave_id = prj.execute(*execute)
+                prj.wait(-1 if wave_id is None else wave_id, waiter)
+                for node in collect:
+                    name = node if isinstance(node, str) else node['name']
+                    outputs[name] = fetch_data(prj.dataset(node))
+            except Exception as exc:  # the user fetch function may raise anything
+                error = exc
+
+            with lock:
+                results.append(SweepResult(index, parameters, prj.uuid, outputs, warns, error))
+
+    threads = [threading.Thread(target=worker, args=(prj,), daemon=True) for prj in projects]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return sorted(results, key=lambda result: result.index)
@@ -0,0 +1,119 @@
+"""
+polyanalyst6api.waiter
+~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the polling strategy used to wait for long operations.
+"""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Iterator, Optional
+
+from .exceptions import WaitTimeout
+
+__all__ = ['Waiter']
+
+
+class Waiter:
+    """Polls the condition with exponentially growing delays until it's met.
+
+    :param initial_delay: (optional) the delay before the first poll in seconds. Default: ``0.1``
+    :param factor: (optional) the delay multiplier. Default: ``2``
+    :param max_delay: (optional) the ceiling of the delay in seconds. Default: ``5``
+    :param jitter: (optional) the fraction of the delay to randomly add or \
+        subtract to spread polls of concurrent waiters. Default: ``0.1``
+    :param timeout: (optional) the overall deadline in seconds. By default wait forever.
+    :param abort_on_timeout: (optional) abort the project execution when the \
+        timeout is reached. Used by :meth:`Project.wait`.
+
+    Usage::
+
+      >>> waiter = Waiter(max_delay=30, timeout=3600, abort_on_timeout=True)
+      >>> wave_id = prj.execute('Python')
+      >>> seconds = prj.wait(wave_id, waiter)
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(
+        self,
+        initial_delay: float = 0.1,
+        factor: float = 2,
+        max_delay: float = 5,
+        jitter: float = 0.1,
+        timeout: Optional[float] = None,
+        abort_on_timeout: bool = False,
+    ) -> None:
+        if initial_delay < 0 or max_delay < initial_delay:
+            raise ValueError('Delays must satisfy 0 <= initial_delay <= max_delay')
+        if factor < 1:
+            raise ValueError('factor must be greater than or equal to 1')
+        if not 0 <= jitter < 1:
+            raise ValueError('jitter must be within [0, 1)')
+
+        self.initial_delay = initial_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.timeout = timeout
+        self.abort_on_timeout = abort_on_timeout
+
+    def __repr__(self):
+        return (
+            f'<Waiter [{self.initial_delay}..{self.max_delay}s x{self.factor}, timeout={self.timeout}]>'
+        )
+
+    def delays(self) -> Iterator[float]:
+        """Yields delays between polls."""
+        delay = self.initial_delay
+        while True:
+            yield delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+            delay = min(delay * self.factor, self.max_delay)
+
+    def wait(self, is_pending: Callable[[], bool], on_timeout: Optional[Callable[[], None]] = None) -> float:
+        """
+        Waits while `is_pending` returns True and returns the number of seconds waited.
+
+        :param is_pending: the function polled after every delay
+        :param on_timeout: (optional) the function called before raising \
+            :class:`WaitTimeout <WaitTimeout>`
+
+        :raises: WaitTimeout if `is_pending` still returns True after the timeout
+        """
+        started = time.monotonic()
+        for delay in self._schedule(started):
+            time.sleep(delay)
+            if not is_pending():
+                return time.monotonic() - started
+
+        if on_timeout is not None:
+            on_timeout()
+        raise WaitTimeout(f'The operation has not completed in {self.timeout} seconds')
+
+    async def wait_async(
+        self,
+        is_pending: Callable[[], Awaitable[bool]],
+        on_timeout: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> float:
+        """The coroutine counterpart of :meth:`Waiter.wait` polling the coroutine function."""
+        started = time.monotonic()
+        for delay in self._schedule(started):
+            await asyncio.sleep(delay)
+            if not await is_pending():
+                return time.monotonic() - started
+
+        if on_timeout is not None:
+            await on_timeout()
+        raise WaitTimeout(f'The operation has not completed in {self.timeout} seconds')
+
+    def _schedule(self, started: float) -> Iterator[float]:
+        """Yields delays until the deadline, the last one is cut to end at the deadline.
+        At least one delay is yielded, so the condition is polled at least once."""
+        deadline = None if self.timeout is None else started + self.timeout
+        for i, delay in enumerate(self.delays()):
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0 and i:
+                    return
+                delay = min(delay, max(left, 0))
+            yield delay
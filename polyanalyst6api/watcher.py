@@ -0,0 +1,171 @@
+"""
+polyanalyst6api.watcher
+~~~~~~~~~~~~~~~~~~~~~~~
+
+This module contains the background poller of execution waves.
+"""
+import collections
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .exceptions import CircuitOpen, PAException
+from .retry import _is_transient
+from .waiter import Waiter
+
+__all__ = ['WaveWatcher']
+
+
+class WaveWatcher:
+    """Waits for execution waves of many projects in the single background thread.
+
+    Each watched wave gets the :class:`concurrent.futures.Future` which result is
+    set to the number of seconds passed since the :meth:`WaveWatcher.watch` call
+    when the wave is found completed. If several waves of the same project are
+    watched then the project is checked for any running operation first, and
+    the waves are checked one by one only if the project is busy. Projects
+    failed with transient errors (see :class:`RetryPolicy`) are polled again
+    with the delays of `backoff`, other errors are set to futures of their waves.
+
+    Usually the watcher is accessed via :attr:`API.watcher <API.watcher>`.
+
+    :param api: An instance of :class:`API <API>` class
+    :param interval: (optional) the delay between polling rounds in seconds. Default: ``1``
+    :param max_rate: (optional) max number of requests per second. Default: ``10``
+    :param backoff: (optional) the delays between polls of the project after \
+        transient errors. Default: the backoff of :attr:`API.retry` or ``Waiter(0.5, 2, 30)``
+
+    Usage::
+
+      >>> futures = [api.project(uuid).watch(api.project(uuid).execute('Python')) for uuid in uuids]
+      >>> concurrent.futures.wait(futures)
+
+    .. versionadded:: 0.21.0
+    """
+
+    def __init__(self, api, interval: float = 1, max_rate: float = 10, backoff: Optional[Waiter] = None) -> None:
+        if backoff is None:
+            retry = getattr(api, 'retry', None)
+            backoff = retry.backoff if retry is not None else Waiter(0.5, 2, 30)
+        self.api = api
+        self.interval = interval
+        self.max_rate = max_rate
+        self.backoff = backoff
+        self._waves: Dict[str, List[Tuple[int, float, Future]]] = collections.defaultdict(list)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        # backoff delays and the time of the next poll of projects failed with transient errors
+        self._delays: Dict[str, Iterator[float]] = {}
+        self._next_poll: Dict[str, float] = {}
+        self._last_request = 0.0
+
+    def __repr__(self):
+        return f'<WaveWatcher [{sum(map(len, self._waves.values()))} waves]>'
+
+    def watch(self, uuid: str, wave_id: int) -> Future:
+        """
+        Starts watching the execution wave and returns the future of its' completion.
+
+        :param uuid: The project uuid
+        :param wave_id: Execution wave identifier
+        """
+        if wave_id is None:
+            raise ValueError('The server has not returned the execution wave identifier')
+
+        future: Future = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError('The watcher is stopped')
+            self._waves[uuid].append((wave_id, time.monotonic(), future))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='polyanalyst6api-watcher', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def stop(self) -> None:
+        """Stops the polling thread and cancels futures of not completed waves."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+        for waves in self._waves.values():
+            for _, _, future in waves:
+                future.cancel()
+        self._waves.clear()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._waves and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                uuids = list(self._waves)
+
+            now = time.monotonic()
+            for uuid in uuids:
+                if self._next_poll.get(uuid, now) <= now:
+                    self._poll_project(uuid)
+
+            with self._cond:
+                if self._waves and not self._stopped:
+                    self._cond.wait(self.interval)
+
+    def _poll_project(self, uuid: str) -> None:
+        with self._cond:
+            waves = list(self._waves.get(uuid, ()))
+        waves = [wave for wave in waves if not wave[2].done()]  # skip cancelled by user
+
+        try:
+            if len(waves) > 1 and not self._is_running(uuid, -1):
+                done = waves
+            else:
+                done = [wave for wave in waves if not self._is_running(uuid, wave[0])]
+        except Exception as exc:
+            if self._is_transient(exc):
+                delays = self._delays.setdefault(uuid, self.backoff.delays())
+                self._next_poll[uuid] = time.monotonic() + next(delays)
+                return
+            done, error = waves, exc
+        else:
+            error = None
+        self._delays.pop(uuid, None)
+        self._next_poll.pop(uuid, None)
+
+        now = time.monotonic()
+        with self._cond:
+            remaining = [wave for wave in self._waves.get(uuid, ()) if wave not in done and not wave[2].done()]
+            if remaining:
+                self._waves[uuid] = remaining
+            else:
+                self._waves.pop(uuid, None)
+
+        for _, started, future in done:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(now - started)
+
+    def _is_running(self, uuid: str, wave_id: int) -> bool:
+        delay = self._last_request + 1 / self.max_rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._last_request = time.monotonic()
+
+        data = self.api.get('project/is-running', params={'prjUUID': uuid, 'executionWave': wave_id})
+        return bool(data['result'])
+
+    def _is_transient(self, exc: Exception) -> bool:
+        if isinstance(exc, CircuitOpen):
+            return True
+        retry = getattr(self.api, 'retry', None)
+        statuses = retry.statuses if retry is not None else (502, 503, 504)
+        return isinstance(exc, PAException) and _is_transient(exc, statuses)
@@ -0,0 +1,149 @@
+import http.server
+import json
+import socketserver
+import threading
+import time
+import urllib.parse
+from typing import Any, NamedTuple, Optional, Tuple
+
+import pytest
+
+ROWS = [[i, f'row {i}'] for i in range(20)]
+FILE = bytes(range(256)) * 64
+
+
+class Reply(NamedTuple):
+    """The response of the route other than 200 with json-encoded data."""
+    status: int
+    data: Any
+    headers: Tuple[Tuple[str, str], ...] = ()
+    content_type: Optional[str] = None
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Answers with the route of the server route table by the endpoint.
+
+    Routes are called with the handler which has ``command``, ``endpoint``,
+    ``query``, ``body`` (json), ``content`` and ``cookies`` of the request and
+    return json-serializable data, bytes or :class:`Reply`.
+    """
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        content = self.rfile.read(length) if length else b''
+        self.query = dict(urllib.parse.parse_qsl(url.query))
+        self.content = content
+        self.body = json.loads(content) if 'json' in self.headers.get('Content-Type', '') else {}
+        self.cookies = dict(
+            c.strip().split('=', 1) for c in self.headers.get('Cookie', '').split(';') if '=' in c
+        )
+        self.endpoint = url.path.rsplit('/v1.0/', 1)[-1]
+        self.server.connections.add(self.client_address)
+        self.server.calls.append(self.endpoint)
+
+        route = self.server.routes.get(self.endpoint)
+        reply = route(self) if route is not None else Reply(404, b'Not Found')
+        if not isinstance(reply, Reply):
+            reply = Reply(200, reply)
+        self.reply(*reply)
+
+    do_POST = do_PATCH = do_HEAD = do_DELETE = do_GET
+
+    def reply(self, status, data, headers=(), content_type=None):
+        if isinstance(data, bytes):
+            body = data
+            content_type = content_type or ('application/octet-stream' if status < 400 else 'text/plain')
+        else:
+            body = json.dumps(data).encode()
+            content_type = content_type or 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for item in headers:
+            self.send_header(*item)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """The local server of PolyAnalyst API stubs.
+
+    ``calls`` are the endpoints of received requests, ``connections`` are
+    addresses of the clients. Attributes of the route state are passed as keywords.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, routes, **state):
+        super().__init__(('127.0.0.1', 0), Handler)
+        self.routes = dict(routes)
+        self.calls = []
+        self.connections = set()
+        self.__dict__.update(state)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+def dataset_info(request):
+    columns = [
+        {'id': 0, 'title': 'id', 'type': 'Integer', 'flags': {}},
+        {'id': 1, 'title': 'text', 'type': 'String', 'flags': {}},
+    ]
+    return {'rowCount': len(ROWS), 'columnsInfo': columns}
+
+
+def dataset_values(request):
+    offset = request.body.get('offset', 0)
+    return {'table': ROWS[offset:offset + request.body['rowCount']]}
+
+
+def is_running(request):
+    request.server.hits += 1
+    time.sleep(0.2)
+    return {'result': 1}
+
+
+def download(request):
+    return FILE if request.query.get('uid') == 'uid' else Reply(404, b'Not Found')
+
+
+ROUTES = {
+    'dataset/wrapper-guid': lambda request: {'wrapperGuid': 'guid'},
+    'dataset/info': dataset_info,
+    'dataset/values': dataset_values,
+    'project/is-running': is_running,
+    'file/download': lambda request: {'uid': 'uid'},
+    '/polyanalyst/download': download,
+}
+
+
+@pytest.fixture
+def make_server():
+    """Returns the factory of started :class:`Server` instances stopped after the test."""
+    servers = []
+
+    def make(routes=ROUTES, **state):
+        server = Server(routes, **state)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def server(make_server):
+    """The server of dataset and file download routes."""
+    return make_server(hits=0)
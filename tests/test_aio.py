@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from polyanalyst6api import APIException
+from polyanalyst6api.aio import AsyncAPI, AsyncDataSet, AsyncProject
+
+from .conftest import FILE, ROWS, Reply
+
+NODE = {'id': 1, 'name': 'Python', 'type': 'Dataset'}
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_concurrent_dataset_reads(server):
+    async def main():
+        api = AsyncAPI(server.url, 'user', limit=3)
+        try:
+            prj = AsyncProject(api, 'uuid')
+
+            async def read_dataset():
+                return [row['id'] async for row in AsyncDataSet(prj, NODE).iter_rows(chunk_size=3)]
+
+            datasets = await asyncio.gather(*(read_dataset() for _ in range(8)))
+            content = await api.drive.download_file('file')
+        finally:
+            await api.close()
+        return datasets, content
+
+    datasets, content = run(main())
+    assert datasets == [[row[0] for row in ROWS]] * 8
+    assert content == FILE
+    assert len(server.connections) <= 3
+
+
+def test_row_range_and_types(server):
+    async def main():
+        api = AsyncAPI(server.url, 'user')
+        try:
+            ds = AsyncDataSet(AsyncProject(api, 'uuid'), NODE)
+            return [row async for row in ds.iter_rows(5, 9, chunk_size=3, row_type='tuple')]
+        finally:
+            await api.close()
+
+    assert run(main()) == [tuple(row) for row in ROWS[5:9]]
+
+
+def test_error_response(server):
+    async def main():
+        api = AsyncAPI(server.url, 'user')
+        try:
+            await api.get('unknown')
+        finally:
+            await api.close()
+
+    with pytest.raises(APIException) as exc:
+        run(main())
+    assert exc.value.status_code == 404
+
+
+def test_login_session_cookie(make_server):
+    def server_info(request):
+        if request.cookies.get('sid') != 'sid':
+            return Reply(403, b'You are not logged in')
+        return {'build': 1}
+
+    server = make_server({
+        'login': lambda request: Reply(200, {}, (('Set-Cookie', 'sid=sid; Path=/'),)),
+        'server/info': server_info,
+    })
+
+    async def main():
+        api = AsyncAPI(server.url, 'user')
+        try:
+            await api.login()
+            return await api.get_server_info()
+        finally:
+            await api.close()
+
+    assert run(main()) == {'build': 1}
+
+
+def test_concurrent_guid_update(make_server):
+    def wrapper_guid(request):
+        request.server.guids += 1
+        return {'wrapperGuid': f"guid {request.server.guids}"}
+
+    def dataset_info(request):
+        if request.query['wrapperGuid'] != f"guid {request.server.guids}":
+            return Reply(500, {'error': {'message': 'The wrapper with the given GUID is not found on the server'}})
+        return {'rowCount': 0, 'columnsInfo': []}
+
+    server = make_server({'dataset/wrapper-guid': wrapper_guid, 'dataset/info': dataset_info}, guids=0)
+
+    async def main():
+        api = AsyncAPI(server.url, 'user')
+        try:
+            prj = AsyncProject(api, 'uuid')
+            prj._wrapper_guids[NODE['id']] = 'expired'
+            await asyncio.gather(*(AsyncDataSet(prj, NODE).get_info() for _ in range(4)))
+        finally:
+            await api.close()
+
+    run(main())
+    assert server.guids == 1
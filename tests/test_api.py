@@ -0,0 +1,93 @@
+import concurrent.futures
+import json
+import math
+import time
+
+from polyanalyst6api import API
+from polyanalyst6api import api as api_module
+from polyanalyst6api.api import _SingleFlight
+from polyanalyst6api.project import DataSet, Project
+
+from .conftest import FILE, Reply
+
+
+def test_threads_share_connection_pool(server):
+    api = API(server.url, 'user', pool_maxsize=3, pool_block=True)
+    prj = Project(api, 'uuid')
+    node = {'id': 1, 'name': 'Python', 'type': 'Dataset'}
+
+    def read_dataset(_):
+        return [row['id'] for row in DataSet(prj, node).iter_rows(chunk_size=3)]
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        datasets = executor.map(read_dataset, range(16))
+        files = executor.map(lambda _: api.drive.download_file('file.bin'), range(16))
+        assert list(datasets) == [list(range(20))] * 16
+        assert list(files) == [FILE] * 16
+
+    # 16 datasets by 7 windows + 2 requests per file, but no more connections than pool size
+    assert 1 <= len(server.connections) <= 3
+
+
+def test_binary_response_is_not_decoded(server, tmp_path):
+    api = API(server.url, 'user')
+    resp, data = api.request('/polyanalyst/download', method='get', params={'uid': 'uid'})
+    assert data is None and resp.content == FILE
+
+    _, data = api.request('dataset/wrapper-guid', method='get')
+    assert data == {'wrapperGuid': 'guid'}
+
+    assert api.drive.download('file.bin', tmp_path / 'file.bin', chunk_size=1000) == len(FILE)
+    assert (tmp_path / 'file.bin').read_bytes() == FILE
+
+
+def test_nan_values_are_decoded(make_server):
+    values = Reply(200, b'{"table": [[NaN, 1]]}', content_type='application/json')
+    server = make_server({'dataset/values': lambda request: values})
+    table = API(server.url, 'user').get('dataset/values')['table']
+    assert math.isnan(table[0][0]) and table[0][1] == 1
+
+
+def test_decode_false(make_server, monkeypatch):
+    csv = Reply(200, b'[1,2]\n[3,4]\n', content_type='text/csv')
+    server = make_server({
+        'file/download': lambda request: {'uid': 'uid'},
+        '/polyanalyst/download': lambda request: csv,
+    })
+    api = API(server.url, 'user')
+
+    loads = []
+    monkeypatch.setattr(api_module, '_json_loads', lambda content: loads.append(content) or json.loads(content))
+    resp, data = api.request('/polyanalyst/download', method='get', decode=False)
+    assert data is None and resp.content == csv.data
+    assert api.drive.download_file('file.csv') == csv.data
+    assert csv.data not in loads
+
+
+def test_coalesce_identical_requests(server):
+    api = API(server.url, 'user', coalesce=True, coalesce_ttl=60)
+    params = {'prjUUID': 'uuid', 'executionWave': 1}
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: api.get('project/is-running', params=params), range(16)))
+    assert results == [{'result': 1}] * 16
+    assert server.hits == 1
+
+    results[0]['result'] = 0  # callers get own copies
+    assert api.get('project/is-running', params=params) == {'result': 1}
+    api.get('project/is-running', params={**params, 'executionWave': 2})
+    assert server.hits == 2
+
+    api.post('dataset/wrapper-guid')  # drops reused responses
+    api.get('project/is-running', params=params)
+    assert server.hits == 3
+
+
+def test_coalesced_results_expire():
+    flight = _SingleFlight(ttl=0.05)
+    for key in range(10):
+        flight.call(key, lambda: (None, key))
+    assert flight.call(0, lambda: (None, 'new')) == (None, 0)
+    time.sleep(0.05)
+    flight.call('next', lambda: (None, 'next'))
+    assert list(flight._calls) == ['next']
@@ -0,0 +1,49 @@
+from polyanalyst6api import APIException, Waiter
+from polyanalyst6api.batch import run_projects
+
+
+class FakeProject:
+    def __init__(self, uuid, log):
+        self.uuid = uuid
+        self.log = log
+
+    def execute(self, *nodes):
+        if self.uuid == 'broken':
+            raise APIException('Node not found')
+        self.log.append((self.uuid, 'execute', nodes))
+        return 1
+
+    def wait(self, wave_id, waiter):
+        if self.uuid == 'offline':
+            raise ConnectionError('Connection refused')
+        self.log.append((self.uuid, 'wait', wave_id))
+
+    def is_running(self, wave_id):
+        return False
+
+    def save(self):
+        self.log.append((self.uuid, 'save'))
+
+    def unload(self):
+        self.log.append((self.uuid, 'unload'))
+
+
+class FakeAPI:
+    def __init__(self):
+        self.log = []
+
+    def project(self, uuid, lazy=False):
+        return FakeProject(uuid, self.log)
+
+
+def test_run_projects():
+    api = FakeAPI()
+    jobs = [('a', ['Python']), ('broken', ['Python']), ('b', []), ('offline', [])]
+    runs = run_projects(api, jobs, waiter=Waiter(0, jitter=0))
+
+    assert [run.uuid for run in runs] == ['a', 'broken', 'b', 'offline']
+    assert runs[0].ok and set(runs[0].timings) == {'execute', 'wait', 'save', 'unload'}
+    assert not runs[1].ok and set(runs[1].timings) == {'unload'}
+    assert ('a', 'execute', ('Python',)) in api.log
+    assert ('broken', 'unload') in api.log
+    assert isinstance(runs[3].error, ConnectionError) and set(runs[3].timings) == {'execute', 'unload'}
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from polyanalyst6api import API, APIException
+from polyanalyst6api.cluster import Cluster
+
+from .conftest import Reply
+
+ROWS = [[i] for i in range(10)]
+NODES = [{'id': 1, 'name': 'Python', 'type': 'Dataset', 'status': 'synchronized'}]
+
+
+def available(route):
+    def wrapper(request):
+        server = request.server
+        if server.down or (request.endpoint == 'dataset/values' and server.values_left == 0):
+            return Reply(503, b'Service Unavailable')
+        return route(request)
+    return wrapper
+
+
+def dataset_values(request):
+    if request.server.values_left is not None:
+        request.server.values_left -= 1
+    offset = request.body.get('offset', 0)
+    return {'table': ROWS[offset:offset + request.body['rowCount']]}
+
+
+def server_info(request):
+    time.sleep(request.server.info_delay)
+    return {'build': 1}
+
+
+ROUTES = {
+    'server/info': server_info,
+    'project/nodes': lambda request: {'nodes': NODES},
+    'project/execution-statistics': lambda request: {'nodes': NODES, 'server': request.server.server_address[1]},
+    'dataset/wrapper-guid': lambda request: {'wrapperGuid': 'guid'},
+    'dataset/info': lambda request: {
+        'rowCount': len(ROWS),
+        'columnsInfo': [{'id': 0, 'title': 'id', 'type': 'Integer', 'flags': {}}],
+    },
+    'dataset/values': dataset_values,
+    'dataset/preview': lambda request: Reply(500, ['Error', 'Preview is not available']),
+}
+
+
+@pytest.fixture
+def servers(make_server):
+    routes = {endpoint: available(route) for endpoint, route in ROUTES.items()}
+    return [make_server(routes, down=False, values_left=None, info_delay=0) for _ in range(3)]
+
+
+def make_cluster(servers, **kwargs):
+    return Cluster([API(s.url, 'user') for s in servers], **kwargs)
+
+
+def test_round_robin_skips_unhealthy(servers):
+    servers[1].down = True
+    cluster = make_cluster(servers, strategy='round-robin')
+    prj = cluster.project('uuid')
+    for _ in range(4):
+        prj.get_execution_stats()
+
+    assert [state.healthy for state in cluster.status()] == [True, False, True]
+    stats_calls = [s.calls.count('project/execution-statistics') for s in servers]
+    assert stats_calls == [2, 0, 2]
+
+
+def test_least_loaded(servers):
+    cluster = make_cluster(servers)
+    ds = cluster.project('uuid').dataset('Python')
+    first = ds.iter_rows(chunk_size=3)
+    second = ds.iter_rows(chunk_size=3)
+    next(first), next(second)  # both iterations hold their servers
+    assert sorted(state.active for state in cluster.status()) == [0, 1, 1]
+    assert list(first) == [{'id': i} for i in range(1, 10)]
+    assert sum(state.active for state in cluster.status()) == 1
+    second.close()
+    assert sum(state.active for state in cluster.status()) == 0
+
+
+def test_hung_health_check(servers):
+    servers[0].info_delay = 3
+    cluster = make_cluster(servers, strategy='round-robin', health_timeout=0.2)
+    started = time.monotonic()
+    cluster.project('uuid').get_execution_stats()
+    assert time.monotonic() - started < 2
+    assert [state.healthy for state in cluster.status()] == [False, True, True]
+
+
+def test_iter_rows_resumes_on_another_server(servers):
+    cluster = make_cluster(servers, strategy='round-robin')
+    cluster.check_health()
+    servers[0].values_left = 2  # the first server fails after 6 rows
+
+    rows = [row['id'] for row in cluster.project('uuid').dataset('Python').iter_rows(chunk_size=3)]
+    assert rows == list(range(10))
+    assert [state.healthy for state in cluster.status()] == [False, True, True]
+
+
+def test_missing_node_is_not_a_server_failure(servers):
+    cluster = make_cluster(servers)
+    with pytest.raises(Exception, match='Node not found'):
+        cluster.project('uuid').dataset('Missing').get_info()
+    assert all(state.healthy for state in cluster.status())
+
+
+def test_application_error_is_not_a_server_failure(servers):
+    cluster = make_cluster(servers)
+    with pytest.raises(APIException, match='Preview is not available') as exc:
+        cluster.project('uuid').dataset('Python').preview()
+    assert exc.value.status_code == 500
+    assert all(state.healthy for state in cluster.status())
+    assert sum(s.calls.count('dataset/preview') for s in servers) == 1
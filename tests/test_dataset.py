@@ -0,0 +1,278 @@
+import concurrent.futures
+import gc
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from polyanalyst6api import DatasetCache
+from polyanalyst6api.exceptions import _WrapperNotFound
+from polyanalyst6api.project import DataSet, Project, _RowIterator
+
+COLUMNS = [
+    {'id': 0, 'title': 'num', 'type': 'Numerical', 'flags': {}},
+    {'id': 1, 'title': 'text', 'type': 'String', 'flags': {'getTextAlways': True}},
+]
+
+
+class FakeAPI:
+    """Serves /dataset/* endpoints from the in-memory table."""
+
+    sid = None
+    max_parallel_downloads = 4
+
+    def __init__(self, row_count=10):
+        self.table = [[float(i), None] for i in range(row_count)]
+        self.calls = []
+        self.end_time = 1
+        self.wrapper_guid = 'guid'
+        self._download_slots = threading.BoundedSemaphore(self.max_parallel_downloads)
+
+    def get(self, endpoint, params=None, json=None, **kwargs):
+        self.calls.append((endpoint, params or json))
+        if endpoint == 'dataset/wrapper-guid':
+            return {'wrapperGuid': self.wrapper_guid}
+        if endpoint.startswith('dataset/') and (params or json)['wrapperGuid'] != self.wrapper_guid:
+            raise _WrapperNotFound
+        if endpoint == 'dataset/info':
+            return {'rowCount': len(self.table), 'columnsInfo': COLUMNS}
+        if endpoint == 'dataset/values':
+            offset = json.get('offset', 0)
+            return {'table': self.table[offset:offset + json['rowCount']]}
+        if endpoint == 'project/execution-statistics':
+            return {'nodes': [{'id': 1, 'status': 'synchronized', 'endTime': self.end_time, 'datasetRows': 10}]}
+        if endpoint == 'dataset/cell-text':
+            return {'text': f"text {json['row']}"}
+        raise AssertionError(endpoint)
+
+    def endpoint_calls(self, endpoint):
+        return [payload for name, payload in self.calls if name == endpoint]
+
+
+@pytest.fixture
+def api():
+    return FakeAPI()
+
+
+@pytest.fixture
+def dataset(api):
+    ds = DataSet(Project(api, 'uuid'), {'id': 1, 'name': 'Python', 'type': 'Dataset'})
+    ds.guid = 'guid'
+    return ds
+
+
+def expected(start, stop):
+    return [{'num': float(i), 'text': f'text {i}'} for i in range(start, stop)]
+
+
+def test_iter_rows(dataset, api):
+    assert list(dataset.iter_rows(2, 5)) == expected(2, 5)
+    assert api.endpoint_calls('dataset/values') == [{'wrapperGuid': 'guid', 'rowCount': 5}]
+
+
+@pytest.mark.parametrize('start, stop, chunk_size', [(0, 10, 3), (2, 9, 4), (0, 10, 10), (5, 5, 2)])
+def test_iter_rows_chunked(dataset, api, start, stop, chunk_size):
+    assert list(dataset.iter_rows(start, stop, chunk_size=chunk_size)) == expected(start, stop)
+    windows = api.endpoint_calls('dataset/values')
+    assert sum(w['rowCount'] for w in windows) == stop - start
+    assert all(w['rowCount'] <= chunk_size for w in windows)
+
+
+def test_iter_rows_chunked_is_lazy(dataset, api):
+    rows = dataset.iter_rows(chunk_size=4)
+    next(rows)
+    assert len(api.endpoint_calls('dataset/values')) == 1
+
+
+@pytest.mark.parametrize('parallel', [2, 3, 8])
+def test_iter_rows_parallel(dataset, api, parallel):
+    assert list(dataset.iter_rows(1, 10, chunk_size=2, parallel=parallel)) == expected(1, 10)
+    assert sorted(w['offset'] for w in api.endpoint_calls('dataset/values') if 'offset' in w) == [1, 3, 5, 7, 9]
+
+
+def test_iter_rows_invalid_range(dataset):
+    with pytest.raises(ValueError):
+        dataset.iter_rows(0, 11)
+    with pytest.raises(ValueError):
+        dataset.iter_rows(chunk_size=0)
+
+
+@pytest.mark.parametrize('text_workers', [0, 1, 3])
+def test_iter_rows_text_workers(dataset, api, text_workers):
+    assert list(dataset.iter_rows(1, 9, chunk_size=3, text_workers=text_workers)) == expected(1, 9)
+    assert sorted(c['row'] for c in api.endpoint_calls('dataset/cell-text')) == list(range(1, 9))
+
+
+def test_iter_rows_abandoned_shuts_down_text_workers(dataset):
+    rows = dataset.iter_rows(text_workers=2)
+    next(rows)
+    executor = rows._executor
+    del rows
+    gc.collect()
+    assert executor._shutdown
+
+
+def test_row_iterator_failed_init_is_collected(monkeypatch):
+    unraisable = []
+    monkeypatch.setattr(sys, 'unraisablehook', unraisable.append)
+    windows = (window for window in [])
+    with pytest.raises(KeyError):
+        _RowIterator({}, windows, None, 0, 1, 0)
+    gc.collect()
+    assert unraisable == []
+
+
+def test_cell_text_concurrent_guid_update(dataset, api):
+    dataset.guid = 'expired'
+    get = api.get
+
+    def get_expired(endpoint, params=None, json=None, **kwargs):
+        if endpoint == 'dataset/cell-text' and json['wrapperGuid'] == 'expired':
+            raise _WrapperNotFound
+        if endpoint == 'dataset/wrapper-guid':
+            time.sleep(0.05)  # let the other threads fail with the expired guid meanwhile
+        return get(endpoint, params, json, **kwargs)
+
+    api.get = get_expired
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        texts = list(executor.map(lambda row: dataset._cell_text(row, 1, 'text'), range(4)))
+    assert texts == [f'text {row}' for row in range(4)]
+    assert len(api.endpoint_calls('dataset/wrapper-guid')) == 1
+
+
+def test_to_columns(dataset, api):
+    api.table[3][0] = None
+    columns = dataset.to_columns(2, 6, chunk_size=3)
+
+    num = columns['num']
+    assert num.values.typecode == 'd'
+    assert list(num.values) == [2.0, 0.0, 4.0, 5.0]
+    assert num.mask == bytearray([1, 0, 1, 1])
+    assert columns['text'].values == ['text 2', 'text 3', 'text 4', 'text 5']
+
+
+def test_to_numpy(dataset, api):
+    numpy = pytest.importorskip('numpy')
+    api.table[3][0] = None
+    arrays = dataset.to_numpy(2, 6)
+
+    assert isinstance(arrays['num'], numpy.ma.MaskedArray)
+    assert arrays['num'].tolist() == [2.0, None, 4.0, 5.0]
+    assert arrays['text'].dtype == object
+    assert arrays['text'].tolist() == ['text 2', 'text 3', 'text 4', 'text 5']
+
+
+def test_iter_rows_row_type(dataset):
+    rows = dataset.iter_rows(2, 4, row_type='tuple')
+    assert rows.columns == ['num', 'text']
+    assert list(rows) == [(2.0, 'text 2'), (3.0, 'text 3')]
+
+    rows = list(dataset.iter_rows(2, 4, row_type='namedtuple'))
+    assert rows[0].num == 2.0 and rows[1].text == 'text 3'
+    assert type(rows[0]) is type(rows[1])
+
+    with pytest.raises(ValueError):
+        dataset.iter_rows(row_type='list')
+
+
+def test_cache(api, tmp_path):
+    cache = DatasetCache(tmp_path)
+    ds = DataSet(Project(api, 'uuid'), {'id': 1, 'name': 'Python', 'type': 'Dataset'}, cache)
+
+    assert list(ds.iter_rows(2, 5)) == expected(2, 5)  # partial range is not cached
+    assert cache.size() == 0
+    assert list(ds.iter_rows(chunk_size=4)) == expected(0, 10)
+    assert cache.size() > 0
+
+    api.calls.clear()
+    assert list(ds.iter_rows(3, 7, chunk_size=3)) == expected(3, 7)
+    assert list(ds.iter_rows(row_type='tuple'))[9] == (9.0, 'text 9')
+    assert [name for name, _ in api.calls] == ['project/execution-statistics'] * 2
+
+    api.end_time = 2  # the node is re-executed
+    assert list(ds.iter_rows(2, 5)) == expected(2, 5)
+    assert 'dataset/values' in [name for name, _ in api.calls]
+
+
+def test_cache_eviction(api, tmp_path):
+    cache = DatasetCache(tmp_path, max_size=1)
+    ds = DataSet(Project(api, 'uuid'), {'id': 1, 'name': 'Python', 'type': 'Dataset'}, cache)
+    list(ds.iter_rows())
+    api.end_time = 2
+    list(ds.iter_rows())
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_cache_abandoned_iteration(api, tmp_path):
+    cache = DatasetCache(tmp_path)
+    ds = DataSet(Project(api, 'uuid'), {'id': 1, 'name': 'Python', 'type': 'Dataset'}, cache)
+    rows = ds.iter_rows(chunk_size=3)
+    next(rows)
+    del rows
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_to_csv(dataset, api, tmp_path):
+    api.table[1][0] = None
+    reports = []
+    stats = dataset.to_csv(tmp_path / 'out.csv', 0, 3, chunk_size=2, progress=reports.append)
+
+    content = (tmp_path / 'out.csv').read_bytes()
+    assert content == b'num,text\r\n0.0,text 0\r\n,text 1\r\n2.0,text 2\r\n'
+    assert (stats.rows, stats.bytes) == (3, len(content))
+    assert [r.rows for r in reports] == [2, 3]
+
+    reports.clear()
+    dataset.to_csv(tmp_path / 'out.csv', 0, 4, chunk_size=2, progress=reports.append)
+    assert [r.rows for r in reports] == [2, 4]  # the last window is reported once
+
+
+def test_to_jsonl(dataset, tmp_path):
+    stats = dataset.to_jsonl(tmp_path / 'out.jsonl', 0, 2)
+
+    content = (tmp_path / 'out.jsonl').read_text(encoding='utf-8')
+    assert content == '{"num":0.0,"text":"text 0"}\n{"num":1.0,"text":"text 1"}\n'
+    assert stats.rows == 2
+
+
+def test_to_jsonl_non_finite_values(dataset, api, tmp_path):
+    api.table[0][0], api.table[1][0] = float('nan'), float('-inf')
+    dataset.to_jsonl(tmp_path / 'out.jsonl', 0, 2)
+
+    lines = (tmp_path / 'out.jsonl').read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {'num': None, 'text': 'text 0'}, {'num': None, 'text': 'text 1'},
+    ]
+
+
+def test_export_resume(dataset, api, tmp_path):
+    path = tmp_path / 'out.csv'
+    path.write_bytes(b'num,text\r\n0.0,text 0\r\n1.0,te')  # interrupted export
+    stats = dataset.to_csv(path, 0, 3, resume=True)
+    assert path.read_bytes() == b'num,text\r\n0.0,text 0\r\n1.0,text 1\r\n2.0,text 2\r\n'
+    assert stats.rows == 2
+    assert api.endpoint_calls('dataset/values')[-1]['offset'] == 1
+
+    path = tmp_path / 'out.jsonl'
+    path.write_text('{"num":0.0,"text":"text 0"}\n{"num"', encoding='utf-8')
+    assert dataset.to_jsonl(path, resume=True).rows == 9
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 10
+
+
+def test_wrapper_guid_is_shared(api):
+    prj = Project(api, 'uuid')
+    node = {'id': 1, 'name': 'Python', 'type': 'Dataset'}
+
+    DataSet(prj, node).get_info()
+    DataSet(prj, node).get_info()
+    assert [name for name, _ in api.calls] == ['dataset/wrapper-guid', 'dataset/info', 'dataset/info']
+
+    api.calls.clear()
+    api.wrapper_guid = 'new guid'  # the wrapper is removed on the server
+    ds = DataSet(prj, node)
+    ds.get_info()
+    DataSet(prj, node).get_info()
+    assert ds.guid == 'new guid'
+    assert [name for name, _ in api.calls] == ['dataset/info', 'dataset/wrapper-guid', 'dataset/info', 'dataset/info']
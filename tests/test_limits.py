@@ -0,0 +1,101 @@
+import concurrent.futures
+import io
+import time
+
+import pytest
+import pytus
+
+from polyanalyst6api import API, Limit, RequestLimiter, RequestMetrics, TokenBucket
+
+from .conftest import FILE, Reply
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=50, burst=5)
+    started = time.monotonic()
+    waits = [bucket.acquire() for _ in range(10)]
+    assert waits[:5] == [0] * 5
+    assert all(wait > 0 for wait in waits[5:])
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+def test_classify():
+    assert RequestLimiter.classify('get', 'project/is-running') == 'polling'
+    assert RequestLimiter.classify('get', 'dataset/cell-text') == 'transfer'
+    assert RequestLimiter.classify('post', 'project/execute') == 'mutation'
+    assert RequestLimiter.classify('get', 'logout') == 'other'
+
+
+def test_concurrency_limit(server):
+    limiter = RequestLimiter(classes={'polling': Limit(concurrency=2)})
+    metrics = RequestMetrics()
+    api = API(server.url, 'user', limiter=limiter, hooks=[metrics])
+
+    with concurrent.futures.ThreadPoolExecutor(6) as executor:
+        list(executor.map(lambda _: api.get('project/is-running'), range(6)))
+
+    stats = limiter.stats()
+    assert stats['polling'].requests == stats['total'].requests == 6
+    assert stats['polling'].in_flight == 0
+    # 6 requests of 0.2 seconds by 2 at once
+    assert stats['polling'].waited > 0.2
+    assert metrics.snapshot()[0].waited == stats['polling'].waited
+
+
+def test_stream_holds_transfer_slot(server, tmp_path):
+    limiter = RequestLimiter(classes={'transfer': Limit(concurrency=1)})
+    api = API(server.url, 'user', limiter=limiter)
+
+    resp, _ = api.request('/polyanalyst/download', method='get', params={'uid': 'uid'}, stream=True)
+    assert limiter.stats()['transfer'].in_flight == 1
+    with resp:
+        assert resp.content == FILE
+    assert limiter.stats()['transfer'].in_flight == 0
+    resp.close()  # the slot is released once
+    assert limiter.stats()['transfer'].in_flight == 0
+
+    assert api.drive.download('file.bin', tmp_path / 'file.bin') == len(FILE)
+    assert limiter.stats()['transfer'].in_flight == 0
+
+
+def test_slot():
+    limiter = RequestLimiter(classes={'transfer': Limit(concurrency=1)})
+    with limiter.slot('PATCH', 'file/upload') as waited:
+        assert waited == 0
+        assert limiter.stats()['transfer'].in_flight == 1
+    with pytest.raises(RuntimeError):
+        with limiter.slot('PATCH', 'file/upload'):
+            raise RuntimeError
+    assert limiter.stats()['transfer'] == (2, 0, 0)
+
+
+def test_upload_holds_transfer_slot(make_server):
+    limiter = RequestLimiter(classes={'transfer': Limit(concurrency=1)})
+
+    def upload(request):
+        if request.command == 'HEAD':
+            return Reply(200, b'', (('Upload-Offset', str(request.server.offset)),))
+        if request.command == 'DELETE':
+            return Reply(204, b'')
+        request.server.in_flight.append(limiter.stats()['transfer'].in_flight)
+        request.server.offset += len(request.content)
+        return Reply(request.server.status, b'')
+
+    server = make_server({
+        'file/upload': lambda request: Reply(201, b'', (('Location', '/polyanalyst/api/v1.0/file/upload/1'),)),
+        'file/upload/1': upload,
+    }, offset=0, status=204, in_flight=[])
+    events = []
+    api = API(server.url, 'user', limiter=limiter, hooks=[events.append])
+
+    api.drive.upload_file(io.BytesIO(FILE), name='file.bin')
+    assert server.offset == len(FILE)
+    assert server.in_flight and set(server.in_flight) == {1}
+    assert limiter.stats()['transfer'].in_flight == 0
+    assert [event.status_code for event in events if event.method == 'PATCH'] == [204]
+
+    events.clear()
+    server.offset, server.status = 0, 460
+    with pytest.raises(pytus.TusError):
+        api.drive.upload_file(io.BytesIO(FILE), name='file.bin')
+    assert [event.status_code for event in events if event.method == 'PATCH'] == [460]
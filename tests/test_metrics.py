@@ -0,0 +1,68 @@
+import pytest
+
+from polyanalyst6api import API, APIException, RequestEvent, RequestMetrics
+
+from .conftest import FILE
+
+
+def test_api_hooks_record_metrics(server):
+    metrics = RequestMetrics(buckets=[1, 10])
+    api = API(server.url, 'user', hooks=[metrics])
+    assert api.drive.download_file('file.bin') == FILE
+    api.get('dataset/wrapper-guid', json={'prjUUID': 'uuid'})
+    api.get('dataset/wrapper-guid')
+    try:
+        api.get('unknown')
+    except Exception:
+        pass
+
+    stats = {(s.method, s.endpoint): s for s in metrics.snapshot()}
+    assert set(stats) == {
+        ('POST', 'file/download'), ('GET', '/polyanalyst/download'),
+        ('GET', 'dataset/wrapper-guid'), ('GET', 'unknown'),
+    }
+    guid = stats['GET', 'dataset/wrapper-guid']
+    assert guid.calls == 2 and guid.statuses == {'200': 2}
+    assert guid.bytes_sent == len('{"prjUUID": "uuid"}')
+    assert guid.buckets == [2, 0, 0]
+    assert stats['GET', '/polyanalyst/download'].bytes_received == len(FILE)
+    assert stats['GET', 'unknown'].statuses == {'404': 1}
+
+
+def test_failed_hook_is_ignored(server, caplog):
+    def broken(event):
+        raise RuntimeError('hook')
+
+    metrics = RequestMetrics()
+    api = API(server.url, 'user', hooks=[broken, metrics])
+    assert api.get('dataset/wrapper-guid') == {'wrapperGuid': 'guid'}
+    with pytest.raises(APIException):
+        api.get('unknown')
+    assert sum(stats.calls for stats in metrics.snapshot()) == 2
+    assert 'Request hook' in caplog.text
+
+
+def test_upload_endpoint_label():
+    api = API('http://localhost', 'user')
+    assert api._endpoint(api.url + 'file/upload/7f3a?x=1') == 'file/upload/{id}'
+    assert api._endpoint(api.url + 'file/upload') == 'file/upload'
+
+
+def test_exporters():
+    metrics = RequestMetrics(buckets=[0.1, 1])
+    metrics(RequestEvent('GET', 'project/is-running', 200, 0.05, 10, 20))
+    metrics(RequestEvent('GET', 'project/is-running', None, 5, 10, 0, attempt=1))
+
+    text = metrics.to_prometheus()
+    labels = 'method="GET",endpoint="project/is-running"'
+    assert f'polyanalyst6api_requests_total{{{labels},status="200"}} 1' in text
+    assert f'polyanalyst6api_requests_total{{{labels},status="error"}} 1' in text
+    assert f'polyanalyst6api_request_retries_total{{{labels}}} 1' in text
+    assert f'polyanalyst6api_request_duration_seconds_bucket{{{labels},le="0.1"}} 1' in text
+    assert f'polyanalyst6api_request_duration_seconds_bucket{{{labels},le="1.0"}} 1' in text
+    assert f'polyanalyst6api_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f'polyanalyst6api_request_duration_seconds_count{{{labels}}} 2' in text
+
+    assert '"calls": 2' in metrics.to_json()
+    metrics.reset()
+    assert metrics.snapshot() == []
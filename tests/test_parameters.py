@@ -0,0 +1,66 @@
+import pytest
+
+from polyanalyst6api import ClientException
+from polyanalyst6api import project
+from polyanalyst6api.project import Parameters
+
+NODES = [
+    {'type': 'Dataset/Python', 'parameters': ['Script'], 'strategies': []},
+    {'type': 'DataSource/INET', 'parameters': ['URL', 'Depth'], 'strategies': [1]},
+]
+
+
+class FakeAPI:
+    base_url = 'https://localhost:5043/polyanalyst/api/'
+
+    def __init__(self, build=2300, cache_dir=None):
+        self.build = build
+        self.parameters_cache_dir = cache_dir
+        self.calls = []
+
+    def _get_server_info_cached(self):
+        return {'build': self.build, 'version': '6.5'}
+
+    def get(self, endpoint):
+        self.calls.append(endpoint)
+        return NODES
+
+    def post(self, endpoint, params, json):
+        self.calls.append(endpoint)
+
+
+@pytest.fixture(autouse=True)
+def clear_schemas():
+    project._schemas.clear()
+
+
+def test_schema_is_cached_by_build():
+    api = FakeAPI()
+    assert Parameters(api, None, None).get() == NODES
+    assert Parameters(api, None, None).schema().node('DataSource/INET')['strategies'] == [1]
+    assert api.calls == ['parameters/nodes']
+
+    api.build = 2301
+    Parameters(api, None, None).get()
+    assert api.calls == ['parameters/nodes'] * 2
+
+
+def test_schema_disk_cache(tmp_path):
+    Parameters(FakeAPI(cache_dir=tmp_path), None, None).schema()
+    project._schemas.clear()
+
+    api = FakeAPI(cache_dir=tmp_path)
+    assert Parameters(api, None, None).schema().node_types() == ['Dataset/Python', 'DataSource/INET']
+    assert api.calls == []
+
+
+def test_set_validate():
+    api = FakeAPI()
+    params = Parameters(api, 'uuid', 1)
+    params.set('DataSource/INET', [{'URL': 'a'}, {'URL': 'b', 'Depth': 2}], validate=True)
+    assert api.calls[-1] == 'parameters/configure-array'
+
+    with pytest.raises(ClientException, match='Unknown parameters'):
+        params.set('DataSource/INET', {'Url': 'a'}, validate=True)
+    with pytest.raises(ClientException, match='not supported'):
+        params.set('Dataset/R', {'Script': ''}, validate=True)
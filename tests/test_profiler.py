@@ -0,0 +1,51 @@
+from polyanalyst6api.profiler import ExecutionProfiler, NodeReport
+
+
+def stats(id, name, duration, rows=None, status='synchronized'):
+    return {
+        'id': id, 'name': name, 'type': 'Dataset', 'status': status, 'duration': duration,
+        'datasetRows': rows, 'freeMemoryInitial': 1000, 'freeMemoryFinal': 600,
+        'freeDiskInitial': 50, 'freeDiskFinal': 50,
+    }
+
+
+class FakeProject:
+    uuid = 'uuid'
+
+    def __init__(self, samples):
+        self.samples = iter(samples)
+        self.current = None
+
+    def get_execution_stats(self):
+        self.current = next(self.samples, self.current)
+        return self.current
+
+    def is_running(self, wave_id):
+        return self.current[0]['status'] != 'synchronized'
+
+
+def test_record_and_report(tmp_path):
+    prj = FakeProject([
+        [stats(1, 'Python', 0, status='unsynchronized'), stats(2, 'Export', 1)],
+        [stats(1, 'Python', 2, status='unsynchronized'), stats(2, 'Export', 1)],
+        [stats(1, 'Python', 4, rows=100), stats(2, 'Export', 1)],
+    ])
+    profiler = ExecutionProfiler(prj)
+    profiler.record(1, interval=0)
+
+    assert len(profiler.series[1]) == 3
+    assert len(profiler.series[2]) == 1  # unchanged statistics are not stored
+
+    slowest = profiler.slowest(1)[0]
+    assert (slowest.name, slowest.duration, slowest.memory_delta, slowest.rows_per_second) == ('Python', 4, 400, 25)
+
+    profiler.save(tmp_path / 'baseline.json')
+    baseline = [NodeReport(1, 'Python', 'Dataset', 'synchronized', 2, 0, 0, 100)]
+    regressions = profiler.compare(baseline)
+    assert [(r.name, r.ratio) for r in regressions] == [('Python', 2)]
+    assert profiler.compare(tmp_path / 'baseline.json') == []
+
+
+def test_rows_per_second_of_unknown_rows():
+    assert NodeReport(1, 'Python', 'Dataset', 'synchronized', 2, 0, 0, -1).rows_per_second is None
+    assert NodeReport(1, 'Python', 'Dataset', 'synchronized', 2, 0, 0, None).rows_per_second is None
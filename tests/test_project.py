@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from polyanalyst6api import Waiter, WaitTimeout
+from polyanalyst6api.exceptions import APIException, ClientException
+from polyanalyst6api.project import Project
+
+
+def test_find_node(monkeypatch):
+    nodes = [
+        {'id': 1, 'name': 'Python', 'type': 'Dataset'},
+        {'id': 2, 'name': 'Example', 'type': 'DataSource'},
+        {'id': 3, 'name': 'Example', 'type': 'Dataset'},
+    ]
+    prj = Project(None, 'uuid')
+    monkeypatch.setattr(prj, 'get_node_list', lambda: nodes)
+    prj._update_node_list()
+
+    assert prj._find_node('Python')['id'] == 1
+    assert prj._find_node({'name': 'Example', 'type': 'Dataset'})['id'] == 3
+    with pytest.raises(ClientException, match='several nodes'):
+        prj._find_node('Example')
+    with pytest.raises(APIException, match='Node not found'):
+        prj._find_node({'name': 'Python', 'type': 'DataSource'})
+
+
+def test_node_list_ttl(monkeypatch):
+    requests = []
+    prj = Project(None, 'uuid', node_list_ttl=60)
+    nodes = [{'id': 1, 'name': 'Python', 'type': 'Dataset'}]
+    monkeypatch.setattr(prj, 'get_node_list', lambda: requests.append(1) or nodes)
+
+    prj.get_node('Python')
+    prj.get_node('Python')
+    assert len(requests) == 1
+
+    prj.invalidate_node_list()
+    prj.get_node('Python')
+    assert len(requests) == 2
+
+    prj.node_list_ttl = 0
+    prj.get_node('Python')
+    assert len(requests) == 3
+
+
+def test_node_lookup_during_refresh(monkeypatch):
+    nodes = [{'id': i, 'name': f'Node {i}', 'type': 'Dataset'} for i in range(10_000)]
+    nodes.append({'id': -1, 'name': 'Python', 'type': 'Dataset'})
+    prj = Project(None, 'uuid')
+    monkeypatch.setattr(prj, 'get_node_list', lambda: nodes)
+    prj._update_node_list()
+
+    stop = threading.Event()
+
+    def refresh():
+        while not stop.is_set():
+            prj._update_node_list()
+
+    thread = threading.Thread(target=refresh)
+    thread.start()
+    try:
+        for _ in range(1000):
+            assert prj.get_node('Python')['id'] == -1
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_execute_without_wave_id_uses_waiter(monkeypatch, recwarn):
+    class FakeAPI:
+        aborted = False
+
+        def request(self, endpoint, method, json):
+            return type('Response', (), {'headers': {}})(), None
+
+        def post(self, endpoint, json):
+            self.aborted = endpoint == 'project/global-abort'
+
+    api = FakeAPI()
+    prj = Project(api, 'uuid')
+    nodes = [{'id': 1, 'name': 'Python', 'type': 'Dataset', 'status': 'running'}]
+    monkeypatch.setattr(prj, 'get_node_list', lambda: nodes)
+
+    with pytest.raises(WaitTimeout):
+        prj.execute('Python', wait=Waiter(initial_delay=0.01, timeout=0.05, abort_on_timeout=True))
+    assert api.aborted
+    assert not [w for w in recwarn if issubclass(w.category, DeprecationWarning)]
+
+    nodes[0]['status'] = 'synchronized'
+    assert prj.execute('Python', wait=True) is None
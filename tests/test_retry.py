@@ -0,0 +1,102 @@
+import pytest
+
+from polyanalyst6api import API, APIException, CircuitBreaker, CircuitOpen, RetryPolicy, Waiter
+from polyanalyst6api.project import Project
+
+from .conftest import Reply
+
+
+def login(request):
+    request.server.session += 1
+    return Reply(200, {}, (('Set-Cookie', f'sid=s{request.server.session}; Path=/'),))
+
+
+def flaky(request):
+    server = request.server
+    if request.cookies.get('sid') != f's{server.session}':
+        return Reply(403, b'You are not logged in')
+    if server.failures:
+        server.failures -= 1
+        return Reply(503, b'Service Unavailable')
+    return {'result': 1}
+
+
+def nodes(request):
+    if request.headers.get('sid') != f's{request.server.session}':
+        return Reply(403, b'You are not logged in')
+    return {'nodes': []}
+
+
+ROUTES = {
+    'login': login,
+    'project/nodes': nodes,
+    'project/is-running': flaky,
+    'project/execute': flaky,
+    'project/save': flaky,
+}
+
+
+@pytest.fixture
+def server(make_server):
+    return make_server(ROUTES, session=0, failures=0)
+
+
+def make_api(server, **kwargs):
+    api = API(server.url, 'user', **kwargs)
+    api.login()
+    server.calls.clear()
+    return api
+
+
+def test_retry_idempotent_requests(server):
+    api = make_api(server, retry=RetryPolicy(retries=2, backoff=Waiter(0, 1, 0)))
+    server.failures = 2
+    assert api.get('project/is-running') == {'result': 1}
+    assert server.calls == ['project/is-running'] * 3
+
+    server.failures = 3
+    with pytest.raises(APIException):
+        api.get('project/is-running')
+
+    server.failures = 1
+    server.calls.clear()
+    with pytest.raises(APIException):
+        api.post('project/execute')  # not idempotent
+    assert server.calls == ['project/execute']
+
+
+def test_relogin_on_expired_session(server):
+    api = make_api(server, retry=RetryPolicy())
+    server.session += 1  # the server forgets the session
+    assert api.post('project/save') == {'result': 1}
+    assert server.calls == ['project/save', 'login', 'project/save']
+
+    api = make_api(server)  # without retry policy
+    server.session += 1
+    with pytest.raises(APIException):
+        api.get('project/is-running')
+
+
+def test_relogin_on_project_nodes(server):
+    api = make_api(server, retry=RetryPolicy())
+    server.session += 1
+    assert Project(api, 'uuid').get_node_list() == []
+    assert server.calls == ['project/nodes', 'login', 'project/nodes']
+
+
+def test_circuit_breaker(server):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    api = make_api(server, circuit_breaker=breaker)
+    server.failures = 2
+    for _ in range(2):
+        with pytest.raises(APIException):
+            api.get('project/is-running')
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpen):
+        api.get('project/is-running')
+    assert len(server.calls) == 2
+
+    breaker._opened -= 60  # the trial request closes the circuit
+    assert breaker.state == 'half-open'
+    assert api.get('project/is-running') == {'result': 1}
+    assert breaker.state == 'closed'
@@ -0,0 +1,76 @@
+import pytest
+
+from polyanalyst6api import FileTokenStore, SessionManager
+
+from .conftest import Reply
+
+
+def login(request):
+    server = request.server
+    server.logins += 1
+    sid = f'sid{server.logins}'
+    server.sessions.add(sid)
+    return Reply(200, {}, (('Set-Cookie', f'sid={sid}; Path=/'),))
+
+
+def logged_in(route):
+    def wrapper(request):
+        if request.cookies.get('sid') not in request.server.sessions:
+            return Reply(403, b'You are not logged in')
+        return route(request)
+    return wrapper
+
+
+def server_info(request):
+    request.server.info_requests += 1
+    return {'build': 1}
+
+
+def logout(request):
+    request.server.sessions.clear()
+    return {}
+
+
+ROUTES = {
+    'login': login,
+    'logout': logged_in(logout),
+    'server/info': logged_in(server_info),
+}
+
+
+@pytest.fixture
+def server(make_server):
+    return make_server(ROUTES, logins=0, info_requests=0, sessions=set())
+
+
+def test_token_is_reused_between_managers(server, tmp_path):
+    url = server.url
+    store = FileTokenStore(tmp_path)
+
+    with SessionManager(url, 'user', store=store) as sessions:
+        with sessions.lease() as api:
+            api.get_server_info()
+        with sessions.lease() as same:
+            assert same is api
+    assert server.logins == 1
+
+    # the next run trusts the recently validated token
+    with SessionManager(url, 'user', store=store).lease() as api:
+        assert api.get_server_info() == {'build': 1}
+    assert server.logins == 1
+
+    # the old token is validated and replaced after the session has expired
+    server.sessions.clear()
+    with SessionManager(url, 'user', store=store, revalidate_after=0).lease() as api:
+        assert api.get_server_info() == {'build': 1}
+    assert server.logins == 2
+    assert store.get(f'{url}|user|')['sid'] == 'sid2'
+
+
+def test_logout_deletes_token(server, tmp_path):
+    url = server.url
+    sessions = SessionManager(url, 'user', store=FileTokenStore(tmp_path))
+    sessions.release(sessions.acquire())
+    sessions.close(logout=True)
+    assert not server.sessions
+    assert sessions.store.get(sessions.key) is None
@@ -0,0 +1,46 @@
+import threading
+
+from polyanalyst6api import APIException
+from polyanalyst6api.sweep import grid, sweep
+
+
+class FakeProject:
+    def __init__(self, uuid):
+        self.uuid = uuid
+        self.value = None
+        self.lock = threading.Lock()
+
+    def parameters(self, name):
+        return self
+
+    def set(self, node_type, parameters, strategies):
+        if parameters['x'] == 3:
+            raise APIException('Invalid parameter')
+        self.value = parameters['x']
+
+    def execute(self, *nodes):
+        return 1
+
+    def wait(self, wave_id, waiter):
+        pass
+
+    def dataset(self, node):
+        return self
+
+    def preview(self):
+        return [{'y': self.value * 10}]
+
+
+def test_grid():
+    assert list(grid(a=[1, 2], b='xy')) == [
+        {'a': 1, 'b': 'x'}, {'a': 1, 'b': 'y'}, {'a': 2, 'b': 'x'}, {'a': 2, 'b': 'y'},
+    ]
+
+
+def test_sweep():
+    projects = [FakeProject('a'), FakeProject('b')]
+    results = sweep(projects, 'Parameters', 'Dataset/Python', grid(x=range(6)), ['Python'], ['Python'])
+
+    assert [r.index for r in results] == list(range(6))
+    assert [r.outputs.get('Python') for r in results] == [[{'y': x * 10}] if x != 3 else None for x in range(6)]
+    assert not results[3].ok
@@ -0,0 +1,21 @@
+import pytest
+
+from polyanalyst6api import Waiter, WaitTimeout
+
+
+def test_delays():
+    delays = Waiter(initial_delay=1, factor=2, max_delay=5, jitter=0).delays()
+    assert [next(delays) for _ in range(5)] == [1, 2, 4, 5, 5]
+
+
+def test_wait():
+    polls = iter([True, True, False])
+    assert Waiter(initial_delay=0.001, max_delay=0.002).wait(lambda: next(polls)) > 0
+
+
+def test_wait_timeout():
+    aborted = []
+    waiter = Waiter(initial_delay=0.01, max_delay=0.01, timeout=0.05)
+    with pytest.raises(WaitTimeout):
+        waiter.wait(lambda: True, on_timeout=lambda: aborted.append(True))
+    assert aborted == [True]
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from polyanalyst6api import APIException, Waiter
+from polyanalyst6api.watcher import WaveWatcher
+
+
+class FakeAPI:
+    def __init__(self):
+        self.running = {('a', 1), ('a', 2), ('b', 1)}
+        self.failures = 0
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get(self, endpoint, params):
+        uuid, wave = params['prjUUID'], params['executionWave']
+        with self.lock:
+            self.calls.append((uuid, wave))
+            if uuid == 'missing':
+                raise APIException('Project not found', endpoint, 404)
+            if uuid == 'broken':
+                raise KeyError('result')
+            if uuid == 'flaky' and self.failures:
+                self.failures -= 1
+                raise APIException('Service Unavailable', endpoint, 503)
+            if wave == -1:
+                return {'result': any(u == uuid for u, _ in self.running)}
+            return {'result': (uuid, wave) in self.running}
+
+
+@pytest.fixture
+def watcher():
+    watcher = WaveWatcher(FakeAPI(), interval=0.01, max_rate=1000, backoff=Waiter(0.01, 2, 0.05))
+    yield watcher
+    watcher.stop()
+
+
+def test_watch(watcher):
+    a1, a2, b1 = watcher.watch('a', 1), watcher.watch('a', 2), watcher.watch('b', 1)
+    watcher.api.running.discard(('b', 1))
+    assert b1.result(timeout=1) >= 0
+    assert not a1.done()
+
+    watcher.api.running.clear()
+    assert a1.result(timeout=1) >= 0 and a2.result(timeout=1) >= 0
+    # idle project with several waves is checked by the single request
+    assert ('a', -1) in watcher.api.calls
+
+
+def test_watch_error(watcher):
+    with pytest.raises(APIException):
+        watcher.watch('missing', 1).result(timeout=1)
+
+
+def test_watch_transient_error(watcher):
+    watcher.api.failures = 3
+    assert watcher.watch('flaky', 1).result(timeout=1) >= 0
+    assert watcher.api.calls.count(('flaky', 1)) == 4
+
+
+def test_watch_unexpected_error_keeps_polling(watcher):
+    with pytest.raises(KeyError):
+        watcher.watch('broken', 1).result(timeout=1)
+    assert watcher._thread.is_alive()
+    watcher.api.running.clear()
+    assert watcher.watch('b', 1).result(timeout=1) >= 0
+
+
+def test_stop_cancels(watcher):
+    future = watcher.watch('a', 1)
+    watcher.stop()
+    assert future.cancelled()